@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026
+#    The planarity contributors
+#
+# planarity (aka untangle) is free software: you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# planarity is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with planarity.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Synthetic levels and input traces for the benchmarks."""
+
+import math
+
+from planarity.levelpack import BASE_SIZE
+
+
+def makeLevel(rng, numEdges, boardSize=BASE_SIZE, scramble=1.0):
+    """Return level data for a random planar graph with about numEdges
+    edges: a jittered grid of vertices, triangulated with a randomly
+    oriented diagonal per cell, with a fifth of the edges dropped.
+
+    Each vertex is then displaced by gaussian noise of scramble times the
+    grid spacing. This keeps the number of crossings roughly proportional
+    to the number of edges, like in a partially solved big level; with
+    scramble=0 the layout is crossing-free."""
+    # a triangulated grid has about three edges per vertex
+    numVertices = max(4, numEdges / 0.8 / 3)
+    spacing = math.sqrt(boardSize[0] * boardSize[1] / numVertices)
+    cols = max(2, int(boardSize[0] / spacing))
+    rows = max(2, int(boardSize[1] / spacing))
+
+    def vertex(col, row):
+        return row * cols + col
+    coords = []
+    for row in range(rows):
+        for col in range(cols):
+            coords.append(((col + 0.5 + rng.uniform(-0.2, 0.2)) * spacing,
+                    (row + 0.5 + rng.uniform(-0.2, 0.2)) * spacing))
+    edges = []
+    for row in range(rows):
+        for col in range(cols):
+            if col + 1 < cols:
+                edges.append((vertex(col, row), vertex(col + 1, row)))
+            if row + 1 < rows:
+                edges.append((vertex(col, row), vertex(col, row + 1)))
+            if col + 1 < cols and row + 1 < rows:
+                if rng.random() < 0.5:
+                    edges.append((vertex(col, row), vertex(col + 1, row + 1)))
+                else:
+                    edges.append((vertex(col + 1, row), vertex(col, row + 1)))
+    edges = [edge for edge in edges if rng.random() >= 0.2]
+
+    if scramble:
+        sigma = scramble * spacing
+        coords = [(min(max(x + rng.gauss(0, sigma), 0), boardSize[0]),
+                min(max(y + rng.gauss(0, sigma), 0), boardSize[1])) for x, y in coords]
+    return {
+        'name': 'random %u edges' % len(edges),
+        'scoring': (1.0, 1.0, '=', 0),
+        'vertices': coords,
+        'edges': edges,
+    }
+
+
+def dragTrace(rng, numVertices, numEvents, boardSize=BASE_SIZE, strokeLength=50):
+    """Yield (vertex, x, y) motion events: random walks of strokeLength
+    events, each dragging one randomly chosen vertex."""
+    vertex, x, y = None, 0, 0
+    for i in range(numEvents):
+        if i % strokeLength == 0:
+            vertex = rng.randrange(numVertices)
+            x, y = rng.uniform(0, boardSize[0]), rng.uniform(0, boardSize[1])
+        x = min(max(x + rng.uniform(-8, 8), 0), boardSize[0])
+        y = min(max(y + rng.uniform(-8, 8), 0), boardSize[1])
+        yield vertex, x, y
+
+
+def lassoTrace(rng, numPoints, center=(640, 360), radius=300):
+    """Yield the points of a slow, slightly wobbly lasso stroke: a bit more
+    than one turn of an inward spiral, which only closes with its last
+    point by heading back out across the start of the stroke."""
+    turns = 1.05
+    for i in range(numPoints - 1):
+        angle = 2 * math.pi * turns * i / numPoints
+        r = radius * (1 - 0.1 * i / numPoints + 0.02 * rng.uniform(-1, 1))
+        yield center[0] + r * math.cos(angle), center[1] + r * math.sin(angle)
+    angle = 2 * math.pi * (turns - 1)
+    yield center[0] + 1.2 * radius * math.cos(angle), center[1] + 1.2 * radius * math.sin(angle)
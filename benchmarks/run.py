@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026
+#    The planarity contributors
+#
+# planarity (aka untangle) is free software: you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# planarity is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with planarity.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Benchmarks for the collision, level start and lasso hot paths.
+
+Runs headless on top of planarity.core; libavg is not needed. Results are
+printed as a table and can be written as JSON with --json, and compared
+against an earlier JSON file with --compare:
+
+    python benchmarks/run.py --json before.json
+    ... change things ...
+    python benchmarks/run.py --compare before.json
+
+Session logs recorded with the game's --record option are replayed as
+additional benchmarks with --replay.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from planarity import core, geometry, recorder
+from planarity.levelpack import LevelPack
+import graphs
+
+EVENTS_PER_FRAME = 4
+GROUP_SIZE = 200
+
+
+def timeit(func, repeat):
+    """return the best wall clock time of repeat calls to func"""
+    best = None
+    for i in range(repeat):
+        gc.collect()
+        start = time.time()
+        func()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def peakMemory(func):
+    """return the peak memory allocated while running func, in bytes"""
+    if tracemalloc is None:
+        return None
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchIntersection(rng, options):
+    numPairs = 20000
+    coords = [rng.uniform(0, 1000) for i in range(8 * numPairs)]
+    segments = [coords[i:i+8] for i in range(0, len(coords), 8)]
+
+    def scalar():
+        for segment in segments:
+            geometry.segmentIntersection(*segment)
+    table = geometry.SegmentTable(2 * numPairs)
+    for i, segment in enumerate(segments):
+        table.set(2*i, segment[0:2], segment[2:4])
+        table.set(2*i + 1, segment[4:6], segment[6:8])
+    first = list(range(0, 2 * numPairs, 2))
+    second = list(range(1, 2 * numPairs, 2))
+
+    def batched():
+        table.intersectPairs(first, second)
+    return {
+        'scalarPairsPerSec': numPairs / timeit(scalar, options.repeat),
+        'batchedPairsPerSec': numPairs / timeit(batched, options.repeat),
+    }
+
+
+def startGame(level):
+    game = core.Game(level)
+    game.start()
+    return game
+
+
+def benchLevelStart(level, options):
+    return {
+        'startSeconds': timeit(lambda: startGame(level), options.repeat),
+        'peakMemoryBytes': peakMemory(lambda: startGame(level)),
+    }
+
+
+def benchDrag(level, rng, options):
+    game = startGame(level)
+    trace = list(graphs.dragTrace(rng, len(level['vertices']), options.events))
+
+    def drag():
+        for i, (vertex, x, y) in enumerate(trace):
+            game.moveVertex(vertex, x, y)
+            if i % EVENTS_PER_FRAME == EVENTS_PER_FRAME - 1:
+                game.update()
+        game.update()
+    return {'eventsPerSec': len(trace) / timeit(drag, options.repeat)}
+
+
+def benchGroupDrag(level, rng, options):
+    game = startGame(level)
+    # like a lasso selection: the vertices closest to a random point
+    centerX, centerY = rng.choice(level['vertices'])
+    group = sorted(range(len(level['vertices'])),
+            key=lambda vertex: (level['vertices'][vertex][0] - centerX) ** 2 +
+                    (level['vertices'][vertex][1] - centerY) ** 2)[:GROUP_SIZE]
+    deltas = [(rng.uniform(-5, 5), rng.uniform(-5, 5)) for i in range(options.events // 10)]
+
+    def drag():
+        for i, (dx, dy) in enumerate(deltas):
+            game.translateVertices(group, dx, dy)
+            if i % EVENTS_PER_FRAME == EVENTS_PER_FRAME - 1:
+                game.update()
+        game.update()
+    return {
+        'groupSize': len(group),
+        'eventsPerSec': len(deltas) / timeit(drag, options.repeat),
+    }
+
+
+def benchLasso(level, rng, options):
+    game = startGame(level)
+    points = list(graphs.lassoTrace(rng, options.lassoPoints))
+    polygons = []
+
+    def lasso():
+        lasso = core.Lasso()
+        for point in points:
+            polygon = lasso.addPoint(point)
+        polygons[:] = [polygon]
+
+    def enclose():
+        game.graph.getEnclosedVertices(polygons[0])
+    return {
+        'pointsPerSec': len(points) / timeit(lasso, options.repeat),
+        'enclosedQuerySeconds': timeit(enclose, options.repeat),
+    }
+
+
+def benchReplay(path, options):
+    records = recorder.readSession(path)
+    replayer = recorder.Replayer(LevelPack(options.pack))
+    stats = []
+
+    def replay():
+        stats[:] = [replayer.replay(records)]
+    seconds = timeit(replay, options.repeat)
+    return {
+        'events': stats[0]['events'],
+        'eventsPerSec': stats[0]['events'] / seconds,
+        'framesPerSec': stats[0]['frames'] / seconds,
+    }
+
+
+def getCommit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                stderr=open(os.devnull, 'w')).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def runBenchmarks(options):
+    rng = random.Random(options.seed)
+    results = {'intersection': benchIntersection(rng, options)}
+    for numEdges in options.sizes:
+        level = graphs.makeLevel(rng, numEdges)
+        prefix = 'edges%u.' % numEdges
+        sizeInfo = {'vertices': len(level['vertices']), 'edges': len(level['edges'])}
+        for name, func in (
+                ('levelStart', lambda: benchLevelStart(level, options)),
+                ('drag', lambda: benchDrag(level, rng, options)),
+                ('groupDrag', lambda: benchGroupDrag(level, rng, options)),
+                ('lasso', lambda: benchLasso(level, rng, options))):
+            result = dict(sizeInfo)
+            result.update(func())
+            results[prefix + name] = result
+    for path in options.replay:
+        results['replay.' + os.path.basename(path)] = benchReplay(path, options)
+    return {
+        'commit': getCommit(),
+        'python': platform.python_version(),
+        'numpy': getattr(geometry.numpy, '__version__', None),
+        'seed': options.seed,
+        'results': results,
+    }
+
+
+def printReport(report, baseline=None):
+    sys.stdout.write('commit %s, python %s, numpy %s\n' %
+            (report['commit'], report['python'], report['numpy']))
+    for name in sorted(report['results']):
+        for key, value in sorted(report['results'][name].items()):
+            if key in ('vertices', 'edges', 'events', 'groupSize') or value is None:
+                continue
+            line = '%-28s %-22s %14.6g' % (name, key, value)
+            try:
+                old = baseline['results'][name][key]
+                line += '  (%+.1f%%)' % (100.0 * (value - old) / old)
+            except (TypeError, KeyError, ZeroDivisionError):
+                pass
+            sys.stdout.write(line + '\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000],
+            help='approximate numbers of edges of the generated levels')
+    parser.add_argument('--events', type=int, default=2000,
+            help='motion events per drag benchmark')
+    parser.add_argument('--lasso-points', dest='lassoPoints', type=int, default=5000,
+            help='points per lasso stroke')
+    parser.add_argument('--repeat', type=int, default=3,
+            help='runs per benchmark; the best one counts')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--replay', nargs='+', default=[], metavar='LOG',
+            help='session logs to replay')
+    parser.add_argument('--pack', default=os.path.join(os.path.dirname(recorder.__file__),
+            'data', 'levels.pack'), help='level pack of the replayed sessions')
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--compare', help='JSON results to compare against')
+    options = parser.parse_args(argv)
+
+    report = runBenchmarks(options)
+    baseline = None
+    if options.compare:
+        with open(options.compare) as fp:
+            baseline = json.load(fp)
+    printReport(report, baseline)
+    if options.json:
+        with open(options.json, 'w') as fp:
+            json.dump(report, fp, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -19,5 +19,12 @@
 # You should have received a copy of the GNU General Public License
 # along with this file.  If not, see <http://www.gnu.org/licenses/>.
 
-from planarity import Planarity
+try:
+    import libavg
+except ImportError:
+    # headless: only the game logic in planarity.core can be used
+    libavg = None
+
+if libavg is not None:
+    from .planarity import Planarity
 
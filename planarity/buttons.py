@@ -3,6 +3,8 @@
 #
 # Copyright (C) 2009
 #    Martin Heistermann, <mh at sponc dot de>
+# Copyright (C) 2026
+#    The planarity contributors
 #
 # This library is free software: you can redistribute it and/or
 # modify it under the terms of the GNU General Public License as published
@@ -24,6 +26,53 @@ from libavg import avg
 g_player = avg.Player.get()
 
 
+class _InertiaEvent(object):
+    """stands in for the cursor event in motion callbacks caused by
+    inertia"""
+    def __init__(self, motion):
+        self.motion = motion
+
+
+class InertiaTicker(object):
+    """Moves all coasting MoveButtons in one frame handler. Inertia is
+    stepped in ticks of TICK_TIME ms; each frame runs the ticks that
+    have passed since the last one and hands every button's summed motion
+    to its callback at once, so the game updates its clashes once per
+    frame however many buttons coast."""
+    TICK_TIME = 10
+
+    def __init__(self):
+        self.__buttons = []
+        self.__frameHandlerID = None
+        self.__tickTime = 0
+
+    def add(self, button):
+        if button in self.__buttons:
+            return
+        if self.__frameHandlerID is None:
+            self.__frameHandlerID = g_player.subscribe(g_player.ON_FRAME, self.__onFrame)
+            self.__tickTime = g_player.getFrameTime()
+        self.__buttons.append(button)
+
+    def remove(self, button):
+        if button in self.__buttons:
+            self.__buttons.remove(button)
+
+    def __onFrame(self):
+        numTicks = int((g_player.getFrameTime() - self.__tickTime) // self.TICK_TIME)
+        self.__tickTime += numTicks * self.TICK_TIME
+        if numTicks:
+            # buttons drop out of the list when they stop
+            for button in list(self.__buttons):
+                button._coast(numTicks)
+        if not self.__buttons:
+            g_player.unsubscribe(self.__frameHandlerID)
+            self.__frameHandlerID = None
+
+
+g_inertiaTicker = InertiaTicker()
+
+
 class Button(object):
     def __init__(self, node):
         self._cursorID = None
@@ -119,11 +168,12 @@ class LabelButton(Button):
 
 
 class MoveButton(Button):
+    """Reports cursor motion, and inertia after release, in the
+    coordinates of the node's parent, so it works in scaled divs."""
     def __init__(self, node, onDown=None, onUp=None, onMotion=None):
         self.__onDownCallback = onDown or (lambda event: False)
         self.__onUpCallback = onUp or (lambda event: False)
         self.__onMotionCallback = onMotion or (lambda event: False)
-        self.__slowdownID = None
         super(MoveButton, self).__init__(node)
 
     def delete(self):
@@ -135,44 +185,45 @@ class MoveButton(Button):
         self.__stopSlowdown()
         self._node.setEventHandler(avg.CURSORMOTION, avg.MOUSE | avg.TOUCH,
                 self.__onMotion)
-        self.__lastPos = event.pos
+        self.__lastPos = self.__getParentPos(event.pos)
         self.__onDownCallback(event)
 
     def _onUp(self, event):
         self._node.setEventHandler(avg.CURSORMOTION, avg.MOUSE | avg.TOUCH, None)
         self.__onUpCallback(event)
         if event.speed.x or event.speed.y:
-            self.__startSlowdown(event)
+            self.__startSlowdown(self.__getParentPos(event.speed) -
+                    self.__getParentPos(avg.Point2D(0, 0)))
 
     def __onMotion(self, event):
         if not self._cursorID == event.cursorid:
             return
-        event.motion = event.pos - self.__lastPos
+        pos = self.__getParentPos(event.pos)
+        event.motion = pos - self.__lastPos
         if event.motion.x or event.motion.y: # avoid (0,0) motion events when using the mouse
-            self.__lastPos = event.pos
+            self.__lastPos = pos
             self.__onMotionCallback(event)
 
-    def __onSlowdownMotion(self):
-        self.__speed *= 0.95
-        if self.__speed.getNorm() < 1:
-            self.__stopSlowdown()
-        else:
+    def __getParentPos(self, pos):
+        return self._node.getParent().getRelPos(pos)
+
+    def _coast(self, numTicks):
+        """run numTicks inertia steps, called by the InertiaTicker"""
+        for tick in xrange(numTicks):
+            self.__speed *= 0.95
+            if self.__speed.getNorm() < 1:
+                self.__stopSlowdown()
+                break
             self.__motionDiff += self.__speed
-            motion = avg.Point2D(round(self.__motionDiff.x), round(self.__motionDiff.y))
-            if motion.x or motion.y:
-                fakeEvent = avg.Event
-                fakeEvent.motion = motion
-                self.__motionDiff -= motion
-                self.__onMotionCallback(fakeEvent)
-
-    def __startSlowdown(self, event):
-        self.__speed = event.speed * 10.0
+        motion = avg.Point2D(round(self.__motionDiff.x), round(self.__motionDiff.y))
+        if motion.x or motion.y:
+            self.__motionDiff -= motion
+            self.__onMotionCallback(_InertiaEvent(motion))
+
+    def __startSlowdown(self, speed):
+        self.__speed = speed * 10.0
         self.__motionDiff = avg.Point2D(0, 0)
-        if self.__slowdownID is None:
-            self.__slowdownID = g_player.setInterval(10, self.__onSlowdownMotion)
+        g_inertiaTicker.add(self)
 
     def __stopSlowdown(self):
-        if not self.__slowdownID is None:
-            g_player.clearInterval(self.__slowdownID)
-            self.__slowdownID = None
-
+        g_inertiaTicker.remove(self)
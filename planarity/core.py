@@ -0,0 +1,473 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2011
+#    Martin Heistermann, <mh at sponc dot de>
+#    Thomas Schott, <scotty at c-base dot org>
+# Copyright (C) 2026
+#    The planarity contributors
+#
+# planarity (aka untangle) is free software: you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# planarity is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with planarity.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Game logic of Planarity, independent of libavg.
+
+Graph holds the geometry and the clashes of a level, Game adds scoring,
+grouping and change notifications on top of it, and Lasso detects closed
+lasso gestures. The libavg classes in planarity.planarity only render
+what these report, so the engine can also run headless, e.g. for
+benchmarks or replaying recorded sessions on a server."""
+
+import threading
+from array import array
+
+from . import profiling
+from .geometry import (numpy, SegmentTable, SpatialGrid, pointsInPolygon,
+        segmentBBox, segmentIntersection)
+
+
+def floatArray(values):
+    """contiguous array of doubles: a NumPy array if available"""
+    if numpy is None:
+        return array('d', values)
+    return numpy.fromiter(values, dtype=float)
+
+
+def intArray(values):
+    if numpy is None:
+        return array('l', values)
+    return numpy.fromiter(values, dtype=int)
+
+
+class GraphChanges(object):
+    """What changed during one Graph.update(). Clashes are given as
+    (edge1, edge2) pairs with edge1 < edge2; their current positions are
+    in Graph.clashes."""
+    def __init__(self):
+        self.edges = set()
+        self.addedClashes = []
+        self.movedClashes = []
+        self.removedClashes = []
+        # edges that became clashed or unclashed
+        self.clashStateEdges = set()
+
+    def __nonzero__(self):
+        return bool(self.edges or self.addedClashes or self.movedClashes
+                or self.removedClashes)
+    __bool__ = __nonzero__
+
+
+class Graph(object):
+    """Vertex positions, edges and clashes of a level.
+
+    Vertices and edges are numbers. Coordinates live in the contiguous
+    arrays xs and ys, edge end points in edgeStarts and edgeEnds, and the
+    clashes in the sparse dict clashes, which maps (edge1, edge2) pairs
+    with edge1 < edge2 to the intersection point.
+
+    Moving vertices only records them; update() recomputes the clashes of
+    all edges touched since the last call in one batch."""
+    def __init__(self, vertexCoords, edges, minCellSize=16):
+        self.numVertices = len(vertexCoords)
+        self.numEdges = len(edges)
+        self.xs = floatArray(pos[0] for pos in vertexCoords)
+        self.ys = floatArray(pos[1] for pos in vertexCoords)
+        self.edgeStarts = intArray(v1 for v1, v2 in edges)
+        self.edgeEnds = intArray(v2 for v1, v2 in edges)
+        self.vertexEdges = [[] for i in range(self.numVertices)]
+        for edge, (v1, v2) in enumerate(edges):
+            self.vertexEdges[v1].append(edge)
+            self.vertexEdges[v2].append(edge)
+
+        self.clashes = {}
+        self.__edgeClashes = [set() for i in range(self.numEdges)]
+
+        self.__segments = SegmentTable(self.numEdges)
+        for edge in range(self.numEdges):
+            self.__segments.set(edge, *self.getEdgeLine(edge))
+        cellSize = self.__getCellSize(minCellSize)
+        self.__edgeIndex = SpatialGrid(cellSize)
+        for edge in range(self.numEdges):
+            self.__edgeIndex.insert(edge, self.getEdgeBBox(edge))
+        self.__vertexIndex = SpatialGrid(cellSize)
+        for vertex in range(self.numVertices):
+            self.__vertexIndex.insert(vertex, self.__getVertexBBox(vertex))
+
+        self.__movedVertices = set()
+        self.__movedGroups = {}
+
+    def getPos(self, vertex):
+        return self.xs[vertex], self.ys[vertex]
+
+    def getEdge(self, edge):
+        return int(self.edgeStarts[edge]), int(self.edgeEnds[edge])
+
+    def getEdgeLine(self, edge):
+        return self.getPos(self.edgeStarts[edge]), self.getPos(self.edgeEnds[edge])
+
+    def getEdgeBBox(self, edge):
+        return segmentBBox(*self.__segments.get(edge))
+
+    def getEdgeClashes(self, edge):
+        """return the set of edges crossing edge"""
+        return self.__edgeClashes[edge]
+
+    def isEdgeClashed(self, edge):
+        return bool(self.__edgeClashes[edge])
+
+    def isVertexClashed(self, vertex):
+        for edge in self.vertexEdges[vertex]:
+            if self.__edgeClashes[edge]:
+                return True
+        return False
+
+    def getNumClashes(self):
+        return len(self.clashes)
+
+    def moveVertex(self, vertex, x, y):
+        self.xs[vertex] = x
+        self.ys[vertex] = y
+        self.__movedVertices.add(vertex)
+
+    def translateVertices(self, vertices, dx, dy):
+        """move a group of vertices rigidly by (dx, dy)"""
+        for vertex in vertices:
+            self.xs[vertex] += dx
+            self.ys[vertex] += dy
+        group = frozenset(vertices)
+        oldDx, oldDy = self.__movedGroups.get(group, (0, 0))
+        self.__movedGroups[group] = (oldDx + dx, oldDy + dy)
+
+    def findClashes(self):
+        """compute the clashes of a new graph from scratch"""
+        assert not self.clashes
+        changes = GraphChanges()
+        for edge1, edge2, x, y in self.__segments.findCrossings():
+            self.__addClash((edge1, edge2), (x, y), changes)
+        return changes
+
+    def update(self):
+        """Recompute the clashes of all edges touching a vertex moved since
+        the last call. Return a GraphChanges instance."""
+        changes = GraphChanges()
+        if not (self.__movedVertices or self.__movedGroups):
+            return changes
+        edges = changes.edges
+        for vertex in self.__movedVertices:
+            edges.update(self.vertexEdges[vertex])
+        # edges with both ends in the same rigidly moved group keep their
+        # clashes among each other
+        rigidEdges = {}
+        for group in self.__movedGroups:
+            for vertex in group:
+                for edge in self.vertexEdges[vertex]:
+                    edges.add(edge)
+                    v1, v2 = self.getEdge(edge)
+                    if (v1 in group and v2 in group and
+                            v1 not in self.__movedVertices and v2 not in self.__movedVertices):
+                        rigidEdges[edge] = group
+        groupDeltas = self.__movedGroups
+        self.__updateVertexIndex()
+        self.__movedVertices = set()
+        self.__movedGroups = {}
+
+        for edge in edges:
+            line = self.getEdgeLine(edge)
+            self.__segments.set(edge, *line)
+            self.__edgeIndex.update(edge, segmentBBox(*line))
+        self.__updateClashes(edges, rigidEdges, groupDeltas, changes)
+        return changes
+
+    def __updateClashes(self, edges, rigidEdges, groupDeltas, changes):
+        first, second = [], []
+        for edge in edges:
+            group = rigidEdges.get(edge)
+            for other in self.__edgeIndex.query(self.getEdgeBBox(edge)):
+                if other == edge or (group is not None and rigidEdges.get(other) is group):
+                    continue
+                # test pairs of moved edges only once
+                if other not in edges or other > edge:
+                    first.append(edge)
+                    second.append(other)
+        profiling.profiler.count('segmentTests', len(first))
+        found = {}
+        for edge1, edge2, x, y in self.__segments.intersectPairs(first, second):
+            found[min(edge1, edge2), max(edge1, edge2)] = (x, y)
+
+        for edge in edges:
+            group = rigidEdges.get(edge)
+            for other in list(self.__edgeClashes[edge]):
+                pair = min(edge, other), max(edge, other)
+                if group is not None and rigidEdges.get(other) is group:
+                    if edge < other:
+                        dx, dy = groupDeltas[group]
+                        x, y = self.clashes[pair]
+                        self.clashes[pair] = (x + dx, y + dy)
+                        changes.movedClashes.append(pair)
+                    continue
+                pos = found.get(pair)
+                if pos is None:
+                    self.__removeClash(pair, changes)
+                elif self.clashes[pair] != pos:
+                    self.clashes[pair] = pos
+                    changes.movedClashes.append(pair)
+        for pair, pos in found.items():
+            if pair not in self.clashes:
+                self.__addClash(pair, pos, changes)
+
+    def __addClash(self, pair, pos, changes):
+        edge1, edge2 = pair
+        self.clashes[pair] = pos
+        for edge, other in ((edge1, edge2), (edge2, edge1)):
+            clashes = self.__edgeClashes[edge]
+            if not clashes:
+                changes.clashStateEdges.symmetric_difference_update((edge,))
+            clashes.add(other)
+        changes.addedClashes.append(pair)
+
+    def __removeClash(self, pair, changes):
+        edge1, edge2 = pair
+        del self.clashes[pair]
+        for edge, other in ((edge1, edge2), (edge2, edge1)):
+            clashes = self.__edgeClashes[edge]
+            clashes.remove(other)
+            if not clashes:
+                changes.clashStateEdges.symmetric_difference_update((edge,))
+        changes.removedClashes.append(pair)
+
+    def getEnclosedVertices(self, polygon):
+        """return the vertices inside polygon, a sequence of (x, y) corners"""
+        # vertices moved since the last update are not indexed yet
+        self.__updateVertexIndex()
+        xCoords = [pos[0] for pos in polygon]
+        yCoords = [pos[1] for pos in polygon]
+        candidates = list(self.__vertexIndex.query(
+                (min(xCoords), min(yCoords), max(xCoords), max(yCoords))))
+        if numpy is None:
+            xs = [self.xs[vertex] for vertex in candidates]
+            ys = [self.ys[vertex] for vertex in candidates]
+        else:
+            xs = self.xs[candidates]
+            ys = self.ys[candidates]
+        inside = pointsInPolygon(xs, ys, polygon)
+        return [vertex for vertex, isInside in zip(candidates, inside) if isInside]
+
+    def __getVertexBBox(self, vertex):
+        x, y = self.getPos(vertex)
+        return x, y, x, y
+
+    def __updateVertexIndex(self):
+        for vertex in self.__movedVertices:
+            self.__vertexIndex.update(vertex, self.__getVertexBBox(vertex))
+        for group in self.__movedGroups:
+            for vertex in group:
+                self.__vertexIndex.update(vertex, self.__getVertexBBox(vertex))
+
+    def __getCellSize(self, minCellSize):
+        # cells about the size of an average edge keep both the number of
+        # cells per edge and the number of edges per cell small
+        if not self.numEdges:
+            return minCellSize
+        extent = 0
+        for edge in range(self.numEdges):
+            x1, y1, x2, y2 = self.getEdgeBBox(edge)
+            extent += max(x2-x1, y2-y1)
+        return max(extent / self.numEdges, minCellSize)
+
+
+class Publisher(object):
+    """Minimal synchronous publish/subscribe, in the spirit of libavg's
+    Publisher: subscribers are called in subscription order."""
+    def __init__(self):
+        self.__subscribers = {}
+
+    def subscribe(self, message, callback):
+        self.__subscribers.setdefault(message, []).append(callback)
+
+    def unsubscribe(self, message, callback):
+        self.__subscribers[message].remove(callback)
+
+    def notifySubscribers(self, message, *args):
+        for callback in list(self.__subscribers.get(message, ())):
+            callback(*args)
+
+
+class Prefetcher(object):
+    """Computes func(key) in a background thread ahead of time, so that a
+    later get(key) finds the result ready. Only the last request is kept."""
+    def __init__(self, func):
+        self.__func = func
+        self.__pending = None
+
+    def request(self, key):
+        if self.__pending is not None and self.__pending[0] == key:
+            return
+        result = []
+        thread = threading.Thread(target=self.__run, args=(key, result))
+        thread.daemon = True
+        self.__pending = (key, thread, result)
+        thread.start()
+
+    def get(self, key):
+        """return func(key), computing it now unless it was requested"""
+        pending, self.__pending = self.__pending, None
+        if pending is None or pending[0] != key:
+            return self.__func(key)
+        key, thread, result = pending
+        thread.join()
+        value, error = result
+        if error is not None:
+            raise error
+        return value
+
+    def __run(self, key, result):
+        try:
+            result[:] = [self.__func(key), None]
+        except Exception as error:
+            result[:] = [None, error]
+
+
+class Game(Publisher):
+    """One level being played: the Graph plus scoring and vertex groups.
+
+    Messages:
+        GRAPH_CHANGED(changes) after clashes were computed or updated, with
+            the GraphChanges instance
+        WON() when the clash goal is reached while the game is running
+        GROUPED(vertices), UNGROUPED(vertices) with lists of vertex numbers
+    """
+    GRAPH_CHANGED = 'GRAPH_CHANGED'
+    WON = 'WON'
+    GROUPED = 'GROUPED'
+    UNGROUPED = 'UNGROUPED'
+
+    def __init__(self, levelData, minCellSize=16):
+        super(Game, self).__init__()
+        self.name = levelData['name']
+        self.scoring = levelData['scoring']
+        self.graph = Graph(levelData['vertices'], levelData['edges'], minCellSize)
+        self.isRunning = False
+        self.__groupedVertices = set()
+        self.__initialChanges = None
+        self.__numClashes = None
+
+    def prepare(self):
+        """Compute the initial clashes. This is the expensive part of
+        starting a level and may run in a background thread, as long as
+        nobody subscribed yet."""
+        if self.__initialChanges is None:
+            with profiling.profiler.timer('findClashes'):
+                self.__initialChanges = self.graph.findClashes()
+
+    def start(self):
+        self.prepare()
+        self.notifySubscribers(self.GRAPH_CHANGED, self.__initialChanges)
+        self.__initialChanges = GraphChanges()
+        self.__numClashes = self.getNumClashes()
+        self.isRunning = True
+
+    def pause(self):
+        self.isRunning = False
+
+    def getNumClashes(self):
+        return self.graph.getNumClashes()
+
+    def getGoal(self):
+        """return the goal as (type, number); possible types are '=' (==)
+        and '*' (<=)"""
+        type_, number = self.scoring[2:4]
+        return type_, number
+
+    def isWon(self):
+        type_, number = self.getGoal()
+        numClashes = self.getNumClashes()
+        return ((type_=='=' and numClashes == number)
+                or (numClashes <= number))
+
+    def checkWin(self):
+        if self.isRunning and self.isWon():
+            self.notifySubscribers(self.WON)
+
+    def moveVertex(self, vertex, x, y):
+        self.graph.moveVertex(vertex, x, y)
+
+    def translateVertices(self, vertices, dx, dy):
+        self.graph.translateVertices(vertices, dx, dy)
+
+    def update(self):
+        """Recompute the clashes touched by vertex motion; call once per
+        frame. The win condition is only checked if the number of clashes
+        changed."""
+        profiler = profiling.profiler
+        with profiler.timer('graphUpdate'):
+            changes = self.graph.update()
+        if changes:
+            profiler.count('graphUpdates')
+            profiler.count('clashesAdded', len(changes.addedClashes))
+            profiler.count('clashesMoved', len(changes.movedClashes))
+            profiler.count('clashesRemoved', len(changes.removedClashes))
+            self.notifySubscribers(self.GRAPH_CHANGED, changes)
+            numClashes = self.getNumClashes()
+            if numClashes != self.__numClashes:
+                self.__numClashes = numClashes
+                self.checkWin()
+        return changes
+
+    def isGrouped(self, vertex):
+        return vertex in self.__groupedVertices
+
+    def groupVertices(self, polygon):
+        """group the ungrouped vertices inside polygon and return them"""
+        newGroup = [vertex for vertex in self.graph.getEnclosedVertices(polygon)
+                if vertex not in self.__groupedVertices]
+        if newGroup:
+            self.__groupedVertices.update(newGroup)
+            self.notifySubscribers(self.GROUPED, newGroup)
+        return newGroup
+
+    def ungroupVertices(self, vertices):
+        self.__groupedVertices.difference_update(vertices)
+        self.notifySubscribers(self.UNGROUPED, list(vertices))
+
+
+class Lasso(object):
+    """Closure detection for a lasso gesture. Finished segments are kept in
+    a SpatialGrid, so each new point is only tested against nearby
+    segments."""
+    def __init__(self, cellSize=32):
+        self.points = []
+        self.__segments = SpatialGrid(cellSize)
+
+    def addPoint(self, pos):
+        """Append a point. If the new last segment intersects an earlier
+        one, return the enclosed polygon as a list of (x, y) corners:
+        the intersection point, followed by all points after the
+        intersecting segment, omitting the last segment. Otherwise return
+        None."""
+        points = self.points
+        if len(points) > 1:
+            lastIndex = len(points) - 2
+            self.__segments.insert(lastIndex, segmentBBox(*points[lastIndex:]))
+        points.append((pos[0], pos[1]))
+        if len(points) < 4:
+            return None
+        (x1, y1), (x2, y2) = points[-2:]
+        # earlier segments are tested in stroke order
+        candidates = sorted(self.__segments.query(segmentBBox(*points[-2:])))
+        profiling.profiler.count('lassoSegmentTests', len(candidates))
+        for i in candidates:
+            (ax, ay), (bx, by) = points[i], points[i + 1]
+            intersection = segmentIntersection(ax, ay, bx, by, x1, y1, x2, y2)
+            if intersection:
+                return [intersection] + points[i + 1:-1]
+        return None
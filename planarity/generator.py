@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026
+#    The planarity contributors
+#
+# planarity (aka untangle) is free software: you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# planarity is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with planarity.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Random levels from line arrangements, as in the original Planarity.
+
+n random lines in general position cross in n(n-1)/2 points. These are
+the vertices; the edges join neighbouring crossings along each line, so
+the arrangement itself is a crossing-free drawing of the graph. The
+vertices are then scrambled onto a circle or randomly over the board.
+
+generatePack() streams levels into a level pack as worker processes
+finish them.
+"""
+
+import math
+import multiprocessing
+import random
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .levelpack import BASE_SIZE, LevelPackWriter
+
+MARGIN = 40
+LAYOUTS = ('circle', 'random')
+# gPlanarity's scoring for its line arrangement levels; the goal is a
+# crossing-free layout
+SCORING = (1.0, 1.0, '=', 0)
+
+
+def _randomLines(rng, numLines):
+    """return the lines as (x, y, dx, dy): a point and a unit direction"""
+    lines = []
+    for i in range(numLines):
+        angle = rng.uniform(0, math.pi)
+        lines.append((rng.uniform(-1, 1), rng.uniform(-1, 1),
+                math.cos(angle), math.sin(angle)))
+    return lines
+
+
+def _lineOrders(lines):
+    """for each line, yield the other lines in the order it crosses them"""
+    if numpy is not None:
+        xs, ys, dxs, dys = [numpy.array(values) for values in zip(*lines)]
+        for i, (x, y, dx, dy) in enumerate(lines):
+            denominators = dx * dys - dy * dxs
+            denominators[i] = 1.0
+            params = ((xs - x) * dys - (ys - y) * dxs) / denominators
+            order = numpy.argsort(params, kind='mergesort')
+            yield order[order != i].tolist()
+    else:
+        for i, (x, y, dx, dy) in enumerate(lines):
+            params = []
+            for j, (x2, y2, dx2, dy2) in enumerate(lines):
+                if j != i:
+                    params.append((((x2 - x) * dy2 - (y2 - y) * dx2) /
+                            (dx * dy2 - dy * dx2), j))
+            params.sort()
+            yield [j for param, j in params]
+
+
+def makeArrangementGraph(rng, numLines):
+    """Return (numVertices, edges) of the planar graph of a random
+    arrangement of numLines lines, with randomly numbered vertices."""
+    numVertices = numLines * (numLines - 1) // 2
+    numbers = list(range(numVertices))
+    rng.shuffle(numbers)
+
+    def vertex(i, j):
+        # number of the crossing of lines i and j
+        if i > j:
+            i, j = j, i
+        return numbers[i * (2 * numLines - i - 1) // 2 + j - i - 1]
+    edges = []
+    for i, order in enumerate(_lineOrders(_randomLines(rng, numLines))):
+        for j1, j2 in zip(order, order[1:]):
+            edges.append((vertex(i, j1), vertex(i, j2)))
+    return numVertices, edges
+
+
+def scrambleLayout(rng, numVertices, layout='circle', boardSize=BASE_SIZE):
+    """Return vertex coordinates on a circle, in random order as the
+    vertices are randomly numbered, or scattered over the board. The
+    coordinates are floats: rounding them would put vertices of large
+    levels on the same point, where the game doesn't count the clashes of
+    their edges."""
+    width, height = boardSize
+    if layout == 'circle':
+        radius = min(width, height) / 2.0 - MARGIN
+        return [(width / 2.0 + radius * math.cos(2 * math.pi * i / numVertices),
+                height / 2.0 + radius * math.sin(2 * math.pi * i / numVertices))
+                for i in range(numVertices)]
+    if layout == 'random':
+        return [(rng.uniform(MARGIN, width - MARGIN), rng.uniform(MARGIN, height - MARGIN))
+                for i in range(numVertices)]
+    raise ValueError('unknown layout %r' % (layout,))
+
+
+def makeLevel(rng, numLines, layout='circle', name=None, boardSize=BASE_SIZE):
+    """return level data for a scrambled line arrangement"""
+    numVertices, edges = makeArrangementGraph(rng, numLines)
+    return {
+        'name': name or 'Lines (Order: %u)' % numLines,
+        'scoring': SCORING,
+        'board': (boardSize[0], boardSize[1], boardSize[0], boardSize[1]),
+        'vertices': scrambleLayout(rng, numVertices, layout, boardSize),
+        'edges': edges,
+    }
+
+
+def _makeLevel(spec):
+    seed, numLines, layout, name = spec
+    return makeLevel(random.Random(seed), numLines, layout, name)
+
+
+def getLevelSpecs(count, minLines, maxLines, seed, layout='circle', prefix='Daily'):
+    """yield (seed, numLines, layout, name) per level, with the number of
+    lines growing from minLines to maxLines over the pack"""
+    for index in range(count):
+        if count > 1:
+            numLines = minLines + (maxLines - minLines) * index // (count - 1)
+        else:
+            numLines = minLines
+        yield (seed * 1000003 + index, numLines, layout,
+                '%s %u (Order: %u)' % (prefix, index + 1, numLines))
+
+
+def generatePack(path, specs, jobs=None):
+    """Generate the levels for specs (see getLevelSpecs) in worker
+    processes and write them to the pack at path in order, as they are
+    finished. Return the number of levels."""
+    writer = LevelPackWriter(path)
+    numLevels = 0
+    jobs = jobs or multiprocessing.cpu_count()
+    pool = None
+    try:
+        if jobs == 1:
+            levels = (_makeLevel(spec) for spec in specs)
+        else:
+            pool = multiprocessing.Pool(jobs)
+            levels = pool.imap(_makeLevel, specs)
+        for level in levels:
+            writer.addLevel(level)
+            numLevels += 1
+    finally:
+        writer.close()
+        if pool is not None:
+            # all results are in, or something went wrong and the
+            # remaining ones aren't wanted
+            pool.terminate()
+            pool.join()
+    return numLevels
@@ -0,0 +1,294 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2011
+#    Martin Heistermann, <mh at sponc dot de>
+#    Thomas Schott, <scotty at c-base dot org>
+# Copyright (C) 2026
+#    The planarity contributors
+#
+# planarity (aka untangle) is free software: you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# planarity is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with planarity.  If not, see <http://www.gnu.org/licenses/>.
+
+import math
+from bisect import bisect_right
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def segmentBBox(p1, p2):
+    """return the bounding box (minX, minY, maxX, maxY) of a line segment"""
+    return (min(p1[0], p2[0]), min(p1[1], p2[1]),
+            max(p1[0], p2[0]), max(p1[1], p2[1]))
+
+
+def segmentIntersection(ax1, ay1, ax2, ay2, bx1, by1, bx2, by2):
+    """Intersect segment a with segment b and return the intersection point
+    as (x, y), or None. Segments sharing an end point, and parallel
+    segments, never intersect."""
+    if ((ax1 == bx1 and ay1 == by1) or (ax1 == bx2 and ay1 == by2)
+            or (ax2 == bx1 and ay2 == by1) or (ax2 == bx2 and ay2 == by2)):
+        return None
+    c = ax2 - ax1
+    d = ay2 - ay1
+    g = bx2 - bx1
+    h = by2 - by1
+    dem = g*d - c*h
+    if dem == 0: # parallel
+        return None
+    s = (ax1*d + by1*c - ay1*c - bx1*d) / dem
+    x = bx1 + s*g
+    y = by1 + s*h
+    if (_between(x, ax1, ax2) and _between(x, bx1, bx2)
+            and _between(y, ay1, ay2) and _between(y, by1, by2)):
+        return x, y
+    return None
+
+
+def intersectSegments(ax1, ay1, ax2, ay2, bx1, by1, bx2, by2):
+    """Vectorized segmentIntersection(): the arguments are NumPy arrays (or
+    scalars) that are broadcast against each other. Return the crossing
+    mask and the x and y coordinates of the intersection points, which are
+    only meaningful where the mask is set."""
+    c = ax2 - ax1
+    d = ay2 - ay1
+    g = bx2 - bx1
+    h = by2 - by1
+    dem = g*d - c*h
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        s = (ax1*d + by1*c - ay1*c - bx1*d) / dem
+        x = bx1 + s*g
+        y = by1 + s*h
+        mask = ((dem != 0)
+                & _between(x, ax1, ax2) & _between(x, bx1, bx2)
+                & _between(y, ay1, ay2) & _between(y, by1, by2))
+    mask &= ~(((ax1 == bx1) & (ay1 == by1)) | ((ax1 == bx2) & (ay1 == by2))
+            | ((ax2 == bx1) & (ay2 == by1)) | ((ax2 == bx2) & (ay2 == by2)))
+    return mask, x, y
+
+
+def _between(val, b1, b2):
+    # works for both scalars and arrays; comparisons with NaN are False
+    return ((b1 >= val) & (val >= b2)) | ((b1 <= val) & (val <= b2))
+
+
+def pointsInPolygon(xs, ys, polygon):
+    """Even-odd test of the points (xs[i], ys[i]) against a polygon given as
+    a sequence of (x, y) corners. Return a sequence of booleans."""
+    if numpy is None:
+        return [_pointInPolygon(x, y, polygon) for x, y in zip(xs, ys)]
+    if not len(xs) or not len(polygon):
+        return numpy.zeros(len(xs), dtype=bool)
+    corners = numpy.array([(p[0], p[1]) for p in polygon], dtype=float)
+    xi, yi = corners[:, 0], corners[:, 1]
+    xj, yj = numpy.roll(xi, 1), numpy.roll(yi, 1)
+    px = numpy.asarray(xs, dtype=float)
+    py = numpy.asarray(ys, dtype=float)
+    # a side can only be crossed by the points with min(yi, yj) <= y <
+    # max(yi, yj), which form a contiguous run of the points sorted by y
+    order = numpy.argsort(py, kind='mergesort')
+    sortedY = py[order]
+    runStarts = numpy.searchsorted(sortedY, numpy.minimum(yi, yj), side='left')
+    runLengths = numpy.searchsorted(sortedY, numpy.maximum(yi, yj), side='left') - runStarts
+    sides = numpy.repeat(numpy.arange(len(corners)), runLengths)
+    runOffsets = numpy.repeat(numpy.cumsum(runLengths) - runLengths, runLengths)
+    points = order[runStarts[sides] + numpy.arange(len(sides)) - runOffsets]
+    xi, yi, xj, yj = xi[sides], yi[sides], xj[sides], yj[sides]
+    crossed = px[points] < (xj - xi) * (py[points] - yi) / (yj - yi) + xi
+    return numpy.bincount(points[crossed], minlength=len(px)) % 2 == 1
+
+
+def _pointInPolygon(x, y, polygon):
+    inside = False
+    xj, yj = polygon[-1][0], polygon[-1][1]
+    for corner in polygon:
+        xi, yi = corner[0], corner[1]
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / float(yj - yi) + xi:
+            inside = not inside
+        xj, yj = xi, yi
+    return inside
+
+
+class SegmentTable(object):
+    """Fixed-size struct-of-arrays table of line segments. Uses NumPy if it
+    is available, and plain lists otherwise."""
+    CROSSING_CHUNK_SIZE = 1 << 18
+
+    def __init__(self, size):
+        self.size = size
+        if numpy is None:
+            self.x1, self.y1, self.x2, self.y2 = [[0.0] * size for i in range(4)]
+        else:
+            self.x1, self.y1, self.x2, self.y2 = numpy.zeros((4, size))
+
+    def set(self, index, p1, p2):
+        self.x1[index] = float(p1[0])
+        self.y1[index] = float(p1[1])
+        self.x2[index] = float(p2[0])
+        self.y2[index] = float(p2[1])
+
+    def get(self, index):
+        return ((self.x1[index], self.y1[index]), (self.x2[index], self.y2[index]))
+
+    def intersectPairs(self, first, second):
+        """Intersect the segments in first pairwise with those in second (two
+        equally long sequences of indices) in one kernel call. Return a list
+        of (index1, index2, x, y) tuples, one per crossing pair."""
+        if numpy is None:
+            return self.__intersectPairsPython(first, second)
+        if not len(first):
+            return []
+        first = numpy.asarray(first, dtype=int)
+        second = numpy.asarray(second, dtype=int)
+        mask, xs, ys = intersectSegments(
+                self.x1[first], self.y1[first], self.x2[first], self.y2[first],
+                self.x1[second], self.y1[second], self.x2[second], self.y2[second])
+        return list(zip(first[mask].tolist(), second[mask].tolist(),
+                xs[mask].tolist(), ys[mask].tolist()))
+
+    def findCrossings(self):
+        """Return all crossings in the table as a list of (index1, index2,
+        x, y) tuples with index1 < index2.
+
+        This is a sweep-and-prune pass: segments are sorted by their left
+        end, so the segments whose x ranges overlap a given segment's range
+        to the right of it form a contiguous run of the sorted order. Only
+        those pairs that also overlap in y are handed to the kernel."""
+        if numpy is None:
+            return self.__findCrossingsPython()
+        minX = numpy.minimum(self.x1, self.x2)
+        maxX = numpy.maximum(self.x1, self.x2)
+        minY = numpy.minimum(self.y1, self.y2)
+        maxY = numpy.maximum(self.y1, self.y2)
+        order = numpy.argsort(minX, kind='mergesort')
+        sortedMinX = minX[order]
+        runEnds = numpy.searchsorted(sortedMinX, maxX[order], side='right')
+        runLengths = runEnds - numpy.arange(1, self.size + 1)
+
+        pairCounts = numpy.cumsum(runLengths)
+        crossings = []
+        chunkStart = 0
+        while chunkStart < self.size:
+            # bound the number of pairs tested per kernel call: take runs up
+            # to CROSSING_CHUNK_SIZE pairs past the chunk start in the running
+            # pair count, computed once, but at least one run so that a run
+            # longer than a chunk still makes progress
+            pairsBefore = pairCounts[chunkStart] - runLengths[chunkStart]
+            chunkEnd = max(chunkStart + 1, numpy.searchsorted(pairCounts,
+                    pairsBefore + self.CROSSING_CHUNK_SIZE, side='right'))
+            lengths = runLengths[chunkStart:chunkEnd]
+            first = numpy.repeat(numpy.arange(chunkStart, chunkEnd), lengths)
+            runOffsets = numpy.repeat(numpy.cumsum(lengths) - lengths, lengths)
+            second = first + 1 + numpy.arange(len(first)) - runOffsets
+            chunkStart = chunkEnd
+
+            first, second = order[first], order[second]
+            first, second = numpy.minimum(first, second), numpy.maximum(first, second)
+            overlap = (minY[first] <= maxY[second]) & (minY[second] <= maxY[first])
+            first = first[overlap]
+            second = second[overlap]
+            mask, xs, ys = intersectSegments(
+                    self.x1[first], self.y1[first], self.x2[first], self.y2[first],
+                    self.x1[second], self.y1[second], self.x2[second], self.y2[second])
+            first = first[mask]
+            second = second[mask]
+            crossings.extend(zip(first.tolist(), second.tolist(),
+                    xs[mask].tolist(), ys[mask].tolist()))
+        return crossings
+
+    def __findCrossingsPython(self):
+        x1, y1, x2, y2 = self.x1, self.y1, self.x2, self.y2
+        boxes = [segmentBBox((x1[i], y1[i]), (x2[i], y2[i])) for i in range(self.size)]
+        order = sorted(range(self.size), key=lambda i: boxes[i][0])
+        sortedMinX = [boxes[i][0] for i in order]
+        crossings = []
+        for pos, index in enumerate(order):
+            minX, minY, maxX, maxY = boxes[index]
+            for other in order[pos+1:bisect_right(sortedMinX, maxX)]:
+                otherBox = boxes[other]
+                if otherBox[1] > maxY or minY > otherBox[3]:
+                    continue
+                a, b = min(index, other), max(index, other)
+                point = segmentIntersection(x1[a], y1[a], x2[a], y2[a],
+                        x1[b], y1[b], x2[b], y2[b])
+                if point:
+                    crossings.append((a, b, point[0], point[1]))
+        return crossings
+
+    def __intersectPairsPython(self, first, second):
+        x1, y1, x2, y2 = self.x1, self.y1, self.x2, self.y2
+        hits = []
+        for index1, index2 in zip(first, second):
+            point = segmentIntersection(x1[index1], y1[index1], x2[index1], y2[index1],
+                    x1[index2], y1[index2], x2[index2], y2[index2])
+            if point:
+                hits.append((index1, index2, point[0], point[1]))
+        return hits
+
+
+class SpatialGrid(object):
+    """Uniform grid of square cells, indexing arbitrary hashable items by
+    their bounding boxes. Items whose boxes overlap always share at least
+    one cell, so query() returns a superset of the overlapping items."""
+    def __init__(self, cellSize):
+        assert cellSize > 0
+        self.__cellSize = float(cellSize)
+        self.__cells = {}
+        self.__itemCells = {}
+
+    def __cellRange(self, bbox):
+        minX, minY, maxX, maxY = bbox
+        cellSize = self.__cellSize
+        return (int(math.floor(minX / cellSize)), int(math.floor(minY / cellSize)),
+                int(math.floor(maxX / cellSize)), int(math.floor(maxY / cellSize)))
+
+    def __iterCells(self, cellRange):
+        minX, minY, maxX, maxY = cellRange
+        for x in range(minX, maxX + 1):
+            for y in range(minY, maxY + 1):
+                yield x, y
+
+    def insert(self, item, bbox):
+        assert item not in self.__itemCells
+        cellRange = self.__cellRange(bbox)
+        self.__itemCells[item] = cellRange
+        for key in self.__iterCells(cellRange):
+            cell = self.__cells.get(key)
+            if cell is None:
+                self.__cells[key] = cell = set()
+            cell.add(item)
+
+    def remove(self, item):
+        for key in self.__iterCells(self.__itemCells.pop(item)):
+            cell = self.__cells[key]
+            cell.discard(item)
+            if not cell:
+                del self.__cells[key]
+
+    def update(self, item, bbox):
+        """move an item; cheap if it stays within the same cells"""
+        if self.__cellRange(bbox) != self.__itemCells[item]:
+            self.remove(item)
+            self.insert(item, bbox)
+
+    def query(self, bbox):
+        """return the set of items sharing a cell with bbox"""
+        items = set()
+        for key in self.__iterCells(self.__cellRange(bbox)):
+            cell = self.__cells.get(key)
+            if cell:
+                items.update(cell)
+        return items
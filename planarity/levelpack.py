@@ -0,0 +1,376 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026
+#    The planarity contributors
+#
+# planarity (aka untangle) is free software: you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# planarity is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with planarity.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Level pack files.
+
+A level pack starts with a fixed size header, followed by one binary block
+per level and a JSON index at the end (all numbers little-endian):
+
+    magic       8 bytes, 'PLNRPACK'
+    version     uint32
+    reserved    uint32
+    indexPos    uint64, file offset of the index
+
+Each index entry holds the name, scoring and board of a level, plus the
+offset, vertex and edge counts, coordinate type and md5 hash of its
+block. A block holds the vertex coordinates as int32 ('i') or float64
+('d') x, y pairs, followed by the edges as int32 vertex number pairs.
+
+Packs are written level by level with LevelPackWriter and read with
+LevelPack, which memory-maps the file and decodes levels on demand.
+openShared() hands out one LevelPack per file to everybody in the process.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from hashlib import md5
+
+MAGIC = b'PLNRPACK'
+VERSION = 1
+HEADER = struct.Struct('<8sIIQ')
+# the board that levels are centered in and played on, in level
+# coordinates; session logs and generated packs rely on it as well
+BASE_SIZE = (1280, 720)
+
+
+class LevelPackError(Exception):
+    pass
+
+
+def _toBytes(values):
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    if hasattr(values, 'tobytes'):
+        return values.tobytes()
+    return values.tostring()
+
+
+def _fromBytes(typecode, data):
+    values = array(typecode)
+    if hasattr(values, 'frombytes'):
+        values.frombytes(data)
+    else:
+        values.fromstring(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def _encode(text):
+    if isinstance(text, bytes):
+        return text
+    return text.encode('utf-8')
+
+
+def _getCoordType(vertices):
+    for vertex in vertices:
+        for coord in vertex:
+            if not isinstance(coord, int) or not -2**31 <= coord < 2**31:
+                return 'd'
+    return 'i'
+
+
+class LevelPackWriter(object):
+    """Streams levels into a new pack file; use as a context manager or
+    call close() when done."""
+    def __init__(self, path):
+        self.__fp = open(path, 'wb')
+        self.__fp.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+        self.__index = []
+
+    def addLevel(self, level):
+        """append a level dict with 'name', 'scoring', 'vertices', 'edges'
+        and optionally 'board'"""
+        vertices = level['vertices']
+        coordType = _getCoordType(vertices)
+        coords = array(coordType, (coord for vertex in vertices for coord in vertex[:2]))
+        edges = array('i', (vertex for edge in level['edges'] for vertex in edge))
+        block = _toBytes(coords) + _toBytes(edges)
+        entry = {
+            'name': level['name'],
+            'scoring': list(level['scoring']),
+            'offset': self.__fp.tell(),
+            'vertices': len(vertices),
+            'edges': len(level['edges']),
+            'coordType': coordType,
+            'hash': md5(block).hexdigest(),
+        }
+        if 'board' in level:
+            entry['board'] = list(level['board'])
+        self.__fp.write(block)
+        self.__index.append(entry)
+
+    def close(self):
+        indexPos = self.__fp.tell()
+        self.__fp.write(json.dumps(self.__index).encode('utf-8'))
+        self.__fp.seek(0)
+        self.__fp.write(HEADER.pack(MAGIC, VERSION, 0, indexPos))
+        self.__fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class LevelPack(object):
+    """Read access to a level pack. Only the index is read up front; levels
+    are decoded from the memory-mapped file when asked for."""
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as fp:
+            self.__map = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.__map) < HEADER.size:
+            raise LevelPackError('%s: not a level pack' % path)
+        magic, version, reserved, indexPos = HEADER.unpack(self.__map[:HEADER.size])
+        if magic != MAGIC:
+            raise LevelPackError('%s: not a level pack' % path)
+        if version != VERSION:
+            raise LevelPackError('%s: unsupported level pack version %u' % (path, version))
+        self.__index = json.loads(self.__map[indexPos:].decode('utf-8'))
+
+    def __len__(self):
+        return len(self.__index)
+
+    def getInfo(self, index):
+        """return the index entry of a level"""
+        return self.__index[index]
+
+    def getName(self, index):
+        return self.__index[index]['name']
+
+    def getLevel(self, index):
+        """decode a level into a dict with 'name', 'scoring', 'board',
+        'vertices' (a list of (x, y) tuples) and 'edges' (a list of
+        vertex number pairs)"""
+        info = self.__index[index]
+        coordType = info['coordType']
+        coordsSize = info['vertices'] * 2 * array(coordType).itemsize
+        edgesSize = info['edges'] * 2 * array('i').itemsize
+        start = info['offset']
+        coords = _fromBytes(coordType, self.__map[start:start + coordsSize])
+        start += coordsSize
+        edges = _fromBytes('i', self.__map[start:start + edgesSize])
+        level = {
+            'name': info['name'],
+            'scoring': tuple(info['scoring']),
+            'vertices': list(zip(coords[0::2], coords[1::2])),
+            'edges': list(zip(edges[0::2], edges[1::2])),
+        }
+        if 'board' in info:
+            level['board'] = tuple(info['board'])
+        return level
+
+    def close(self):
+        self.__map.close()
+
+
+# LevelPacks and chain hashes shared within the process, see openShared()
+_sharedPacks = {}
+_sharedHashes = {}
+_sharedLock = threading.Lock()
+# the pack of a worker process, see initWorker()
+_workerPack = None
+
+
+def openShared(path):
+    """Return the LevelPack for path that is shared by all its users in
+    this process. It is only read, from any thread; don't close it."""
+    key = os.path.realpath(path)
+    with _sharedLock:
+        pack = _sharedPacks.get(key)
+        if pack is None:
+            pack = _sharedPacks[key] = LevelPack(path)
+        return pack
+
+
+def initWorker(path):
+    """multiprocessing.Pool initializer for workers that read one pack:
+    open the pack at path once per process, for getWorkerPack()"""
+    global _workerPack
+    _workerPack = LevelPack(path)
+
+
+def getWorkerPack():
+    """the pack opened by initWorker() in this process"""
+    return _workerPack
+
+
+def setScorings(path, scorings):
+    """Replace the scoring of levels in the pack at path; scorings maps
+    level numbers to scoring tuples. Only the index is rewritten, the
+    level blocks (and with them the unlock hashes) stay as they are."""
+    with open(path, 'r+b') as fp:
+        magic, version, reserved, indexPos = HEADER.unpack(fp.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise LevelPackError('%s: not a level pack of version %u' % (path, VERSION))
+        fp.seek(indexPos)
+        index = json.loads(fp.read().decode('utf-8'))
+        for levelIdx, scoring in scorings.items():
+            index[levelIdx]['scoring'] = list(scoring)
+        fp.seek(indexPos)
+        fp.write(json.dumps(index).encode('utf-8'))
+        fp.truncate()
+
+
+class ChainHashes(object):
+    """The unlock hash of every level of a pack: a running md5, started
+    with seed, over str() of all vertices up to and including the level.
+    Hashes are computed only as far as they are asked for and kept in the
+    JSON file cachePath.
+
+    The cache is keyed by the seed and the block hashes from the pack
+    index, so it stays valid when only the index is rewritten (see
+    setScorings()). Shared by all boards of the process, see
+    loadChainHashes()."""
+    def __init__(self, pack, seed, cachePath):
+        self.__pack = pack
+        self.__seed = seed
+        self.__cachePath = cachePath
+        self.__lock = threading.Lock()
+        blocks = md5()
+        for levelIdx in range(len(pack)):
+            blocks.update(_encode(pack.getInfo(levelIdx)['hash']))
+        self.__key = {
+            'blocks': blocks.hexdigest(),
+            'seed': md5(_encode(seed)).hexdigest(),
+        }
+        self.__dirty = False
+        self.__hashes = self.__readCache()
+        self.__indices = dict((levelHash, levelIdx)
+                for levelIdx, levelHash in enumerate(self.__hashes))
+        # the running md5 can't be restored from the cache; it is rebuilt
+        # once when the chain has to be extended past the cached levels
+        self.__chain = None
+        self.__numChained = 0
+
+    def __len__(self):
+        return len(self.__pack)
+
+    def __getitem__(self, levelIdx):
+        """the unlock hash of a level"""
+        with self.__lock:
+            self.__extend(levelIdx + 1)
+            return self.__hashes[levelIdx]
+
+    def find(self, levelHash):
+        """Return the level number of levelHash, or None. A hash that is
+        not in the pack makes this compute the whole chain."""
+        with self.__lock:
+            numHashes = len(self.__hashes)
+            while levelHash not in self.__indices and numHashes < len(self.__pack):
+                numHashes += 1
+                self.__extend(numHashes, False)
+            self.__writeCache()
+            return self.__indices.get(levelHash)
+
+    def __extend(self, numHashes, writeCache=True):
+        if numHashes <= len(self.__hashes):
+            return
+        if self.__chain is None:
+            self.__chain = md5(_encode(self.__seed))
+        while self.__numChained < numHashes:
+            for vertex in self.__pack.getLevel(self.__numChained)['vertices']:
+                self.__chain.update(_encode(str(vertex)))
+            self.__numChained += 1
+            if self.__numChained > len(self.__hashes):
+                levelHash = self.__chain.hexdigest()
+                self.__indices[levelHash] = len(self.__hashes)
+                self.__hashes.append(levelHash)
+                self.__dirty = True
+        if writeCache:
+            self.__writeCache()
+
+    def __readCache(self):
+        try:
+            with open(self.__cachePath) as fp:
+                cache = json.load(fp)
+            if cache['key'] == self.__key and len(cache['hashes']) <= len(self.__pack):
+                return [str(levelHash) for levelHash in cache['hashes']]
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            pass
+        return []
+
+    def __writeCache(self):
+        if not self.__dirty:
+            return
+        self.__dirty = False
+        try:
+            with open(self.__cachePath, 'w') as fp:
+                json.dump({'key': self.__key, 'hashes': self.__hashes}, fp)
+        except (IOError, OSError):
+            pass
+
+
+def loadChainHashes(pack, seed, cachePath):
+    """Return the ChainHashes of pack and seed that are shared by all
+    callers in the process with the same pack file, seed and cachePath."""
+    key = (os.path.realpath(pack.path), seed, cachePath)
+    with _sharedLock:
+        hashes = _sharedHashes.get(key)
+        if hashes is None:
+            hashes = _sharedHashes[key] = ChainHashes(pack, seed, cachePath)
+        return hashes
+
+
+def centerLevel(level, size, scale=1.0):
+    """Return a copy of level with the vertex coordinates scaled by scale
+    and the level centered in a board of size (width, height)."""
+    vertices = [(x * scale, y * scale) for x, y in level['vertices']]
+    minX = min([size[0]] + [x for x, y in vertices])
+    minY = min([size[1]] + [y for x, y in vertices])
+    maxX = max([0] + [x for x, y in vertices])
+    maxY = max([0] + [y for x, y in vertices])
+    offsetX = (size[0] - (maxX - minX)) / 2.0 - minX
+    offsetY = (size[1] - (maxY - minY)) / 2.0 - minY
+    level = dict(level)
+    level['vertices'] = [(x + offsetX, y + offsetY) for x, y in vertices]
+    return level
+
+
+def convertPickle(src, dst):
+    """convert a gzipped pickle of level dicts (the old levels.pickle.gz
+    format) into a level pack"""
+    import gzip
+    import pickle
+    fp = gzip.open(src)
+    try:
+        if sys.version_info[0] >= 3:
+            levels = pickle.load(fp, encoding='latin1')
+        else:
+            levels = pickle.load(fp)
+    finally:
+        fp.close()
+    with LevelPackWriter(dst) as writer:
+        for level in levels:
+            writer.addLevel(level)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        sys.stderr.write('usage: %s LEVELS.pickle.gz LEVELS.pack\n' % sys.argv[0])
+        sys.exit(2)
+    convertPickle(sys.argv[1], sys.argv[2])
@@ -3,6 +3,8 @@
 #
 # Copyright (C) 2009
 #    Martin Heistermann, <mh at sponc dot de>
+# Copyright (C) 2026
+#    The planarity contributors
 #
 # planarity (aka untangle) is free software: you can redistribute it and/or
 # modify it under the terms of the GNU General Public License as published
@@ -20,16 +22,20 @@
 from libavg import Point2D, app, player, persist
 from libavg.utils import getMediaDir
 
-import gzip
-import cPickle
-from hashlib import md5
+import math
+import os
 
-from buttons import *
+from .buttons import *
+from . import profiling
+from . import recorder
+from .core import Game, Lasso, Prefetcher
+from .levelpack import BASE_SIZE, centerLevel, loadChainHashes, openShared
 
-BASE_SIZE = (1280, 720)
 DS_STATUS_TAG = 'planarity'[::-1]
-
-g_scale = 1.0
+# colors in media/palette.png, used by the mesh renderer
+PALETTE_SIZE = 4
+PALETTE_WHITE, PALETTE_RED, PALETTE_DARK_RED = range(3)
+LEVEL_HASH_CACHE = 'levelhashes.json'
 
 
 def getDelta(motion, topLeft, bottomRight, boundingSize):
@@ -38,11 +44,51 @@ def getDelta(motion, topLeft, bottomRight, boundingSize):
     return Point2D(xDelta, yDelta)
 
 
+class NodePool(object):
+    """Recycles nodes of one type in one parent div. Released nodes are
+    deactivated instead of unlinked and handed out again by acquire(),
+    with the attributes the pool was created with."""
+    def __init__(self, parentNode, nodeType, attrs):
+        self.__parentNode = parentNode
+        self.__nodeType = nodeType
+        self.__attrs = attrs
+        self.__freeNodes = []
+
+    def acquire(self):
+        if not self.__freeNodes:
+            node = player.createNode(self.__nodeType, self.__attrs)
+            self.__parentNode.appendChild(node)
+            return node
+        node = self.__freeNodes.pop()
+        for name, value in self.__attrs.iteritems():
+            setattr(node, name, value)
+        node.active = True
+        return node
+
+    def release(self, node):
+        node.active = False
+        self.__freeNodes.append(node)
+
+
+class BitSet(object):
+    """A fixed size set of numbers from 0 to size-1, stored as one bit
+    per number."""
+    def __init__(self, size):
+        self.size = size
+        self.__bits = bytearray((size + 7) // 8)
+
+    def add(self, number):
+        self.__bits[number >> 3] |= 1 << (number & 7)
+
+    def __contains__(self, number):
+        return bool(self.__bits[number >> 3] & 1 << (number & 7))
+
+
 class VertexGroup(object):
     def __init__(self, gameController, polygon, vertices):
         self._polygon = player.createNode("polygon", {
             'color': 'ffff00',
-            'strokewidth': 3*g_scale,
+            'strokewidth': 3,
             'opacity': 0.3,
             'pos': polygon
             })
@@ -53,7 +99,6 @@ class VertexGroup(object):
 
         self._button = player.createNode('image', {'href': 'close-button.png'})
         self._gameController.vertexDiv.appendChild(self._button)
-        self._button.size *= g_scale
         self._button.pos = polygon[0] - self._button.size/2
         self._button.setEventHandler(avg.CURSORDOWN, avg.TOUCH | avg.MOUSE,
                 lambda event: self.delete())
@@ -66,8 +111,7 @@ class VertexGroup(object):
         def onMotion(event):
             delta = getDelta(event.motion, self.topLeft, self.bottomRight,
                 self._gameController.vertexDiv.size)
-            for i, vertex in enumerate(self._vertices):
-                vertex.pos += delta
+            self._gameController.level.translateVertices(self._vertices, delta)
             self._polygon.pos = [pos + delta for pos in self._polygon.pos]
             self._button.pos += delta
             self.topLeft += delta
@@ -84,6 +128,8 @@ class VertexGroup(object):
 
 class GroupDetector(object):
     """use this as an event handler"""
+    CELL_SIZE = 32
+
     def __init__(self, gameController, event):
         self._gameController = gameController
         self._polyline = player.createNode("polyline", {
@@ -92,6 +138,11 @@ class GroupDetector(object):
             })
         gameController.groupDiv.appendChild(self._polyline)
 
+        # the polyline node is only updated once per frame from the lasso
+        self._lasso = Lasso(self.CELL_SIZE)
+        self._pointsChanged = False
+        self._frameHandlerID = player.subscribe(player.ON_FRAME, self._onFrame)
+
         self._cursorid = event.cursorid
         self._polyline.setEventCapture(self._cursorid)
         self._polyline.setEventHandler(avg.CURSORMOTION, avg.TOUCH | avg.MOUSE,
@@ -100,195 +151,76 @@ class GroupDetector(object):
             lambda event: self.delete())
 
         self._onMotion(event)
-        pass
-
-    def getClosedPolygon(self):
-        """If the last edge intersects any edge, return a cleaned-up polygon
-        representing the enclosed region."""
-        points = self._polyline.pos  # in-Python object copy
-        if len(points) < 4:
-            return False
-        last_edge = points[-2:]
-        for i in range(len(points) - 2):
-            edge = [points[i], points[i + 1]]
-            intersection = line_intersect(edge, last_edge)
-            if intersection:
-                # include the intersection point itself, plus all the edges
-                # after the intersecting edge, omitting the last edge
-                return [intersection] + points[i + 1:-1]
-        return False
 
     def _onMotion(self, event):
-        self._polyline.pos += [event.pos]
-        polygon = self.getClosedPolygon()
+        polygon = self._lasso.addPoint(self._gameController.groupDiv.getRelPos(event.pos))
+        self._pointsChanged = True
         if polygon:
+            polygon = [Point2D(pos) for pos in polygon]
             vertices = self._gameController.groupVertices(polygon)
             if vertices:
                 self.delete()
                 VertexGroup(self._gameController, polygon, vertices)
 
+    def _onFrame(self):
+        if self._pointsChanged:
+            self._polyline.pos = self._lasso.points
+            self._pointsChanged = False
+
     def delete(self):
+        player.unsubscribe(self._frameHandlerID)
         self._polyline.releaseEventCapture(self._cursorid)
         self._polyline.setEventHandler(avg.CURSORMOTION, avg.TOUCH | avg.MOUSE, None)
         self._polyline.unlink()
 
 
-def in_between(val,b1,b2):
-    """return True if val is between b1 and b2"""
-    return((b1>=val and val>=b2) or (b1<=val and val<=b2))
-
-def line_collide(line1,line2):
-    a=line1[0].x
-    b=line1[0].y
-    c=line1[1].x-line1[0].x
-    d=line1[1].y-line1[0].y
-    e=line2[0].x
-    f=line2[0].y
-    g=line2[1].x-line2[0].x
-    h=line2[1].y-line2[0].y
-
-    dem=g*d-c*h
-    if dem==0: # parallel 
-        return False
-
-    s=(a*d+f*c-b*c-e*d)/dem
-    x=e+s*g
-    y=f+s*h
-    return Point2D(x,y)
-
-def line_intersect(line1, line2):
-    ka, kb = line1
-    la, lb = line2
-    if (ka == la
-            or ka == lb
-            or kb == la
-            or kb == lb):
-        return False
-    p = line_collide(line1, line2)
-    if(p and in_between(p.x,ka.x,kb.x) # do line segments match?
-            and in_between(p.x,la.x,lb.x)
-            and in_between(p.y,ka.y,kb.y)
-            and in_between(p.y,la.y,lb.y)):
-        return p
-
-    return False
-
-
 class Clash(object):
-    def __init__(self, gameController, pos, edge1, edge2):
-        self.__edges = edge1, edge2
+    def __init__(self, gameController, pos):
         self.__gameController = gameController
-        gameController.level.addClash() #XXX
-        edge1.addClash(edge2, self)
-        edge2.addClash(edge1, self)
-        #self.__node = player.createNode('image',{
-        #    'href':'clash.png',
-        #    'opacity': 0.7})
-        """
-        self.__node = player.createNode('circle',{
-            'r': 10,
-            'strokewidth': 5,
-            'color': 'aa0000'})
-        """
-        self.__node = player.createNode('rect', {
-                'size':Point2D(20,20)*g_scale,
-                'strokewidth':3*g_scale,
-                'color':'aa0000'})
-        gameController.clashDiv.appendChild(self.__node)
+        self.__node = gameController.clashPool.acquire()
         self.goto(pos)
 
     def goto(self, pos):
         self.__node.pos = pos - self.__node.size/2
 
     def delete(self):
-        edge1, edge2 = self.__edges
-        edge1.removeClash(edge2)
-        edge2.removeClash(edge1)
-        self.__node.unlink()
+        self.__gameController.clashPool.release(self.__node)
         self.__node = None
-        self.__gameController.level.removeClash() #XXX
 
 
 class Edge(object):
-    def __init__(self, gameController, vertex1, vertex2):
-        self.__vertices = vertex1, vertex2
-        for vertex in self.__vertices:
-            vertex.addEdge(self)
-        self.__clashes = {}
+    """view of an edge of the level's Graph"""
+    def __init__(self, gameController, graph, index):
+        self.index = index
         self.__gameController = gameController
-
-        self.__line = player.createNode('line', {'strokewidth':3*g_scale})
-        gameController.edgeDiv.appendChild(self.__line)
-        self.__draw()
-        self.__clashState = False
-
-    def getLine(self):
-        return [v.pos for v in self.__vertices]
-
-    def checkCollisions(self):
-        for other in self.__gameController.getEdges():
-            pos = line_intersect(self.getLine(), other.getLine())
-            if other in self.__clashes.keys():
-                if pos:
-                    self.__clashes[other].goto(pos)
-                else:
-                    self.__clashes[other].delete()
-                    return True
-            elif pos: # new clash
-                Clash(self.__gameController, pos, self, other)
-        return False
-
-    def onVertexMotion(self):
-        clashRemoved = self.checkCollisions()
-        self.__draw()
-        return clashRemoved
-
-    def addClash(self, other, clash):
-        assert other not in self.__clashes.keys()
-        self.__clashes[other] = clash
-        self.updateClashState()
-
-    def removeClash(self, other):
-        del self.__clashes[other]
-        self.updateClashState()
-
-    def __draw(self):
-        self.__line.pos1 = self.__vertices[0].pos
-        self.__line.pos2 = self.__vertices[1].pos
-        if self.isClashed():
+        self.__graph = graph
+        self.__line = gameController.edgePool.acquire()
+        self.draw()
+
+    def draw(self):
+        pos1, pos2 = self.__graph.getEdgeLine(self.index)
+        self.__line.pos1 = pos1
+        self.__line.pos2 = pos2
+        if self.__graph.isEdgeClashed(self.index):
             self.__line.color = 'ff6000' # red
         else:
             self.__line.color = 'ffffff' # white
 
-    def updateClashState(self):
-        clashState = self.isClashed()
-        if clashState != self.__clashState:
-            self.__clashState = clashState
-            self.__draw()
-            for vertex in self.__vertices:
-                vertex.updateClashState()
-
-    def isClashed(self):
-        return len(self.__clashes) > 0
-
     def delete(self):
-        for clash in self.__clashes.values():
-            clash.delete()
-        self.__line.unlink()
+        self.__gameController.edgePool.release(self.__line)
         self.__line = None
-        self.__clashes = {}
 
 
 class Vertex(object):
-    def __init__(self, gameController, pos):
+    """view of a vertex of the level's Graph"""
+    def __init__(self, gameController, graph, index):
+        self.index = index
         self._gameController = gameController
-        self.__edges = []
-        self.__node = player.createNode('image', {'href':'vertex.png'})
+        self.__graph = graph
+        self.__node = gameController.vertexPool.acquire()
         parent = gameController.vertexDiv
-        parent.appendChild(self.__node)
-        self.__node.size *= g_scale
         self.__nodeOffset = self.__node.size / 2
-        self.__node.pos = pos - self.__nodeOffset
+        self.draw()
         self.__clashState = False
         self._highlight = False
         self.draggable = True
@@ -302,16 +234,11 @@ class Vertex(object):
 
         self.__button = MoveButton(self.__node, onMotion=onMotion)
 
-    def addEdge(self, edge):
-        self.__edges.append(edge)
+    def draw(self):
+        self.__node.pos = Point2D(self.__graph.getPos(self.index)) - self.__nodeOffset
 
     def updateClashState(self):
-        clashState = False
-        for edge in self.__edges:
-            if edge.isClashed():
-                clashState = True
-                break
-
+        clashState = self.__graph.isVertexClashed(self.index)
         if clashState != self.__clashState:
             self.__clashState = clashState
             self.__setNodeImage()
@@ -331,15 +258,12 @@ class Vertex(object):
             self.__node.href = href + '.png'
 
     def getPos(self):
-        return self.__node.pos + self.__nodeOffset
+        return Point2D(self.__graph.getPos(self.index))
 
     def setPos(self, value):
-        self.__node.pos = value - self.__nodeOffset
-        clashRemoved = False
-        for edge in self.__edges:
-            clashRemoved |= edge.onVertexMotion()
-        if clashRemoved:
-            self._gameController.level.checkWin()
+        # clashes are updated once per frame by the level
+        self.__graph.moveVertex(self.index, value.x, value.y)
+        self.draw()
 
     pos = property(getPos, setPos)
 
@@ -350,69 +274,228 @@ class Vertex(object):
     def delete(self):
         self.__button.delete()
         self.__button = None
-        self.__node.unlink()
+        self._gameController.vertexPool.release(self.__node)
         self.__node = None
-        self.__edges = None
 
 
-class Level(object):
+class EdgeNodes(object):
+    """draws the edges of a Graph with one line node each"""
+    def __init__(self, gameController, graph):
+        self.__edges = [Edge(gameController, graph, index)
+                for index in xrange(graph.numEdges)]
+
+    def draw(self, index):
+        self.__edges[index].draw()
+
+    def flush(self):
+        pass
+
+    def delete(self):
+        for edge in self.__edges:
+            edge.delete()
+        self.__edges = []
+
+
+class ClashNodes(object):
+    """draws clash markers with one rect node each"""
     def __init__(self, gameController):
         self.__gameController = gameController
-        self.__isRunning = False
-        self.__numClashes = 0
-        self._vertexGroups = []
+        self.__clashes = {}
 
-    def addClash(self):
-        self.__numClashes +=1
-        self.__gameController.updateStatus()
+    def add(self, pair, pos):
+        self.__clashes[pair] = Clash(self.__gameController, Point2D(pos))
 
-    def removeClash(self):
-        assert self.__numClashes > 0
-        self.__numClashes -=1
-        self.__gameController.updateStatus()
+    def goto(self, pair, pos):
+        self.__clashes[pair].goto(Point2D(pos))
 
-    def getStatus(self):
-        type_, number = self.__scoring[2:4]
-        if type_ == '*':
-            type_ = '&lt;='
-        return "clashes left: %u<br/>goal: %s %u" %(self.__numClashes, type_, number)
+    def remove(self, pair):
+        self.__clashes.pop(pair).delete()
 
-    def getName(self):
-        return self.__levelData['name']
+    def flush(self):
+        pass
 
-    def checkWin(self):
-        if self.__isRunning:
-            type_, number = self.__scoring[2:4]
-            # possible types: '=' (==) and '*' (<=)
-            if ((type_=='=' and self.__numClashes == number)
-                    or (self.__numClashes <= number)):
-                self.__gameController.levelWon()
+    def delete(self):
+        for clash in self.__clashes.values():
+            clash.delete()
+        self.__clashes = {}
 
-    def start(self, levelData):
-        self.__levelData = levelData
-        self.__scoring = levelData["scoring"]
 
-        self.vertices = []
-        for vertexCoord in levelData["vertices"]:
-            self.vertices.append(Vertex(self.__gameController, vertexCoord))
+class Mesh(object):
+    """Quads in a single mesh node, each filled with one color of the
+    palette texture. Quads are changed in place; the node itself is only
+    updated by flush(), once per frame."""
+    def __init__(self, parentNode):
+        self.__node = player.createNode('mesh', {'texhref':'palette.png'})
+        parentNode.appendChild(self.__node)
+        self.__coords = []
+        self.__texCoords = []
+        self.__triangles = []
+        self.__changed = False
+        self.__resized = False
+
+    def addQuads(self, count):
+        """append count hidden quads and return the index of the first one"""
+        first = len(self.__coords) // 4
+        for quad in xrange(first, first + count):
+            self.__coords.extend([(0, 0)] * 4)
+            self.__texCoords.extend([(0, 0)] * 4)
+            corner = quad * 4
+            self.__triangles.append((corner, corner+1, corner+2))
+            self.__triangles.append((corner, corner+2, corner+3))
+        self.__resized = True
+        return first
+
+    def setQuad(self, quad, corners, color):
+        corner = quad * 4
+        self.__coords[corner:corner+4] = corners
+        self.__texCoords[corner:corner+4] = [((color + 0.5) / PALETTE_SIZE, 0.5)] * 4
+        self.__changed = True
+
+    def hideQuad(self, quad):
+        corner = quad * 4
+        self.__coords[corner:corner+4] = [(0, 0)] * 4
+        self.__changed = True
+
+    def flush(self):
+        if self.__changed or self.__resized:
+            self.__node.vertexcoords = self.__coords
+            self.__node.texcoords = self.__texCoords
+            if self.__resized:
+                self.__node.triangles = self.__triangles
+            self.__changed = self.__resized = False
+
+    def delete(self):
+        self.__node.unlink()
+        self.__node = None
+
+
+class EdgeMesh(object):
+    """draws the edges of a Graph as quads of one mesh"""
+    def __init__(self, gameController, graph):
+        self.__graph = graph
+        self.__halfWidth = 1.5
+        self.__mesh = Mesh(gameController.edgeDiv)
+        self.__mesh.addQuads(graph.numEdges)
+        for index in xrange(graph.numEdges):
+            self.draw(index)
+        self.__mesh.flush()
+
+    def draw(self, index):
+        (x1, y1), (x2, y2) = self.__graph.getEdgeLine(index)
+        length = math.hypot(x2 - x1, y2 - y1) or 1.0
+        nx = (y1 - y2) / length * self.__halfWidth
+        ny = (x2 - x1) / length * self.__halfWidth
+        if self.__graph.isEdgeClashed(index):
+            color = PALETTE_RED
+        else:
+            color = PALETTE_WHITE
+        self.__mesh.setQuad(index, ((x1+nx, y1+ny), (x1-nx, y1-ny),
+                (x2-nx, y2-ny), (x2+nx, y2+ny)), color)
+
+    def flush(self):
+        self.__mesh.flush()
+
+    def delete(self):
+        self.__mesh.delete()
+
+
+class ClashMesh(object):
+    """draws clash markers as square frames of four quads in one mesh"""
+    def __init__(self, gameController):
+        self.__mesh = Mesh(gameController.clashDiv)
+        self.__outer = 11.5
+        self.__inner = 8.5
+        self.__slots = {}
+        self.__freeSlots = []
+
+    def add(self, pair, pos):
+        if self.__freeSlots:
+            slot = self.__freeSlots.pop()
+        else:
+            slot = self.__mesh.addQuads(4)
+        self.__slots[pair] = slot
+        self.goto(pair, pos)
+
+    def goto(self, pair, pos):
+        slot = self.__slots[pair]
+        x, y = pos
+        o, i = self.__outer, self.__inner
+        for quad, corners in enumerate((
+                ((x-o, y-o), (x+o, y-o), (x+o, y-i), (x-o, y-i)),
+                ((x-o, y+i), (x+o, y+i), (x+o, y+o), (x-o, y+o)),
+                ((x-o, y-i), (x-i, y-i), (x-i, y+i), (x-o, y+i)),
+                ((x+i, y-i), (x+o, y-i), (x+o, y+i), (x+i, y+i)))):
+            self.__mesh.setQuad(slot + quad, corners, PALETTE_DARK_RED)
+
+    def remove(self, pair):
+        slot = self.__slots.pop(pair)
+        for quad in xrange(slot, slot + 4):
+            self.__mesh.hideQuad(quad)
+        self.__freeSlots.append(slot)
+
+    def flush(self):
+        self.__mesh.flush()
+
+    def delete(self):
+        self.__mesh.delete()
+
 
-        self.edges = []
-        for v1, v2 in levelData["edges"]:
-            self.edges.append(Edge(self.__gameController, self.vertices[v1], self.vertices[v2]))
+class Level(object):
+    """renders a core.Game and feeds user input into it"""
+    def __init__(self, gameController):
+        self.__gameController = gameController
+        self._vertexGroups = []
+        self.game = None
+        self.__edgeView = None
+        self.__clashView = None
+        self.__frameHandlerID = None
+        self.__shownNumClashes = None
 
-        for edge in self.edges:
-            edge.checkCollisions()
+    def getStatus(self):
+        type_, number = self.game.getGoal()
+        if type_ == '*':
+            type_ = '&lt;='
+        return "clashes left: %u<br/>goal: %s %u" %(self.game.getNumClashes(), type_, number)
 
-        self.__isRunning = True
+    def getName(self):
+        return self.game.name
+
+    def start(self, game):
+        """show and run a Game that nobody subscribed to yet"""
+        self.game = game
+        self.game.subscribe(Game.GRAPH_CHANGED, self.__applyChanges)
+        self.game.subscribe(Game.WON, self.__gameController.levelWon)
+        self.game.subscribe(Game.GROUPED, self.__onGrouped)
+        self.game.subscribe(Game.UNGROUPED, self.__onUngrouped)
+
+        graph = self.game.graph
+        with profiling.profiler.timer('levelViews'):
+            self.vertices = [Vertex(self.__gameController, graph, index)
+                    for index in range(graph.numVertices)]
+            if self.__gameController.batchRendering:
+                self.__edgeView = EdgeMesh(self.__gameController, graph)
+                self.__clashView = ClashMesh(self.__gameController)
+            else:
+                self.__edgeView = EdgeNodes(self.__gameController, graph)
+                self.__clashView = ClashNodes(self.__gameController)
+            self.game.start()
+            self.__edgeView.flush()
+            self.__clashView.flush()
+
+        self.__updateStatus()
+        self.__frameHandlerID = player.subscribe(player.ON_FRAME, self.__onFrame)
 
     def pause(self):
-        self.__isRunning = False
+        self.game.pause()
 
     def stop(self):
-        self.__isRunning = False
-        for edge in self.edges:
-            edge.delete()
-        self.edges = []
+        self.game.pause()
+        player.unsubscribe(self.__frameHandlerID)
+        self.__frameHandlerID = None
+        self.__clashView.delete()
+        self.__clashView = None
+        self.__edgeView.delete()
+        self.__edgeView = None
         for group in self._vertexGroups:
             group.delete()
         self._vertexGroups = []
@@ -420,29 +503,109 @@ class Level(object):
         for vertex in self.vertices:
             vertex.delete()
         self.vertices = []
+        self.game = None
 
-    def getEnclosedVertices(self, polygon):
-        return [vertex for vertex in self.vertices
-                if avg.pointInPolygon(vertex.pos, polygon)]
+    def translateVertices(self, vertices, delta):
+        """move a group of vertices rigidly by delta"""
+        self.game.translateVertices([vertex.index for vertex in vertices],
+                delta.x, delta.y)
+        for vertex in vertices:
+            vertex.draw()
+
+    def groupVertices(self, polygon):
+        return [self.vertices[index] for index in
+                self.game.groupVertices([(pos.x, pos.y) for pos in polygon])]
+
+    def ungroupVertices(self, vertices):
+        self.game.ungroupVertices([vertex.index for vertex in vertices])
+
+    def __onFrame(self):
+        self.game.update()
+        self.__edgeView.flush()
+        self.__clashView.flush()
+        if self.game.getNumClashes() != self.__shownNumClashes:
+            self.__updateStatus()
+
+    def __updateStatus(self):
+        self.__shownNumClashes = self.game.getNumClashes()
+        self.__gameController.updateStatus()
+
+    def __applyChanges(self, changes):
+        graph = self.game.graph
+        clashView = self.__clashView
+        for pair in changes.removedClashes:
+            clashView.remove(pair)
+        for pair in changes.movedClashes:
+            clashView.goto(pair, graph.clashes[pair])
+        for pair in changes.addedClashes:
+            clashView.add(pair, graph.clashes[pair])
+
+        for index in changes.edges | changes.clashStateEdges:
+            self.__edgeView.draw(index)
+        vertices = set()
+        for index in changes.clashStateEdges:
+            vertices.update(graph.getEdge(index))
+        for index in vertices:
+            self.vertices[index].updateClashState()
+
+    def __onGrouped(self, indices):
+        for index in indices:
+            vertex = self.vertices[index]
+            vertex.highlight(True)
+            vertex.draggable = False
+
+    def __onUngrouped(self, indices):
+        for index in indices:
+            vertex = self.vertices[index]
+            vertex.highlight(False)
+            vertex.draggable = True
 
     def addVertexGroup(self, group):
         self._vertexGroups.append(group)
 
 
-class GameController(object):
-    def __init__(self, parentNode, onExit):
-        self.__ds = persist.UserPersistentData('planarity', DS_STATUS_TAG, '', lambda s: type(s) == str,
-                autoCommit=True)
+def openProgressStore():
+    """the persistent store of the unlock hash of the furthest level"""
+    return persist.UserPersistentData('planarity', DS_STATUS_TAG, '', lambda s: type(s) == str,
+            autoCommit=True)
 
-        self.node = parentNode
-        self.__levels, self.__curLevel = self.__loadLevels(parentNode.size)
 
-        background = player.createNode('image', {'href':'black.png'})
-        background.size = parentNode.size
-        parentNode.appendChild(background)
+class GameController(object):
+    """One board with its menus in parentNode. Several controllers can
+    run side by side; they share the level pack and, if given the same
+    progressStore, the progress."""
+    def __init__(self, parentNode, onExit, batchRendering=False, sessionWriter=None,
+            progressStore=None):
+        self.batchRendering = batchRendering
+        self.__sessionWriter = sessionWriter
+        self.__ds = progressStore or openProgressStore()
 
-        self.gameDiv = player.createNode('div', {})
+        self.node = parentNode
+        self.__levelPack = openShared(getMediaDir(__file__, 'data/levels.pack'))
+        self.__numLevels = len(self.__levelPack)
+        hashCachePath = os.path.join(self.__ds._getUserDataPath(), LEVEL_HASH_CACHE)
+        self.__levelHashes = loadChainHashes(self.__levelPack, self.__ds._getUserDataPath(),
+                hashCachePath)
+        self.__curLevel = self.__getSavedLevel()
+        self.__unlockedLevels = BitSet(self.__numLevels)
+        for levelIdx in xrange(min(self.__curLevel + 1, self.__numLevels)):
+            self.__unlockedLevels.add(levelIdx)
+
+        self.__background = player.createNode('image', {'href':'black.png'})
+        parentNode.appendChild(self.__background)
+
+        # the board is laid out in level coordinates, BASE_SIZE units wide
+        # and high. The HUD covers all of parentNode and is laid out in the
+        # same units. __layOut() scales both to the size of parentNode, and
+        # again whenever that changes. hudDiv has no size of its own, so it
+        # doesn't catch the events meant for the board.
+        self.gameDiv = player.createNode('div', {
+                'size':BASE_SIZE,
+                'pivot':(0, 0)})
         parentNode.appendChild(self.gameDiv)
+        hudDiv = player.createNode('div', {'pivot':(0, 0)})
+        parentNode.appendChild(hudDiv)
+        self.__hudDiv = hudDiv
 
         self.edgeDiv = player.createNode('div', {'sensitive':False})
         self.groupDiv = player.createNode('div', {'sensitive':False})
@@ -450,32 +613,39 @@ class GameController(object):
         self.vertexDiv.subscribe(self.vertexDiv.CURSOR_DOWN, self._onDraw)
         self.clashDiv = player.createNode('div', {'sensitive':False})
 
-        self._groupedVertices = set()
-
         for div in (self.edgeDiv, self.vertexDiv, self.clashDiv, self.groupDiv):
             self.gameDiv.appendChild(div)
-            div.size = parentNode.size
+            div.size = BASE_SIZE
+
+        # level nodes are recycled across clashes and levels
+        vertexNode = player.createNode('image', {'href':'vertex.png'})
+        self.vertexPool = NodePool(self.vertexDiv, 'image', {
+                'href':'vertex.png',
+                'size':vertexNode.getMediaSize()})
+        self.edgePool = NodePool(self.edgeDiv, 'line', {'strokewidth':3})
+        self.clashPool = NodePool(self.clashDiv, 'rect', {
+                'size':(20, 20),
+                'strokewidth':3,
+                'color':'aa0000'})
 
         self.winnerDiv = player.createNode('words', {
                 'text':"YOU WON!",
-                'fontsize':100*g_scale,
+                'fontsize':100,
                 'opacity':0,
                 'sensitive':False})
-        parentNode.appendChild(self.winnerDiv)
-        self.winnerDiv.pos = (parentNode.size - self.winnerDiv.getMediaSize()) / 2
+        hudDiv.appendChild(self.winnerDiv)
 
-        LabelButton(parentNode, 'exit', 30*g_scale, onExit, Point2D(50, 50)*g_scale)
-        LabelButton(parentNode, 'about', 30*g_scale,
-                lambda:self.aboutBox.open(), Point2D(50, 100)*g_scale)
-        LabelButton(parentNode, 'levels', 30*g_scale,
-                lambda:self.levelMenu.open(self.__curLevel-1), Point2D(50, 150)*g_scale)
+        LabelButton(hudDiv, 'exit', 30, onExit, (50, 50))
+        LabelButton(hudDiv, 'about', 30, lambda:self.aboutBox.open(), (50, 100))
+        LabelButton(hudDiv, 'levels', 30,
+                lambda:self.levelMenu.open(self.__curLevel-1), (50, 150))
 
         statusNode = player.createNode('words', {
-                'pos':(parentNode.width-50*g_scale, 50*g_scale),
-                'fontsize':30*g_scale,
+                'fontsize':30,
                 'alignment':'right',
                 'sensitive':False})
-        parentNode.appendChild(statusNode)
+        hudDiv.appendChild(statusNode)
+        self.__statusNode = statusNode
 
         def setStatus(text):
             statusNode.text = text
@@ -486,44 +656,107 @@ class GameController(object):
         bgImage = player.createNode('image', {'href':'menubg.png'})
         levelNameDiv.appendChild(bgImage)
         levelNameNode = player.createNode('words', {
-                'fontsize':30*g_scale,
-                'pos':Point2D(20, 20)*g_scale,
+                'fontsize':30,
+                'pos':(20, 20),
                 'sensitive':False})
         levelNameDiv.appendChild(levelNameNode)
 
         def setLevelName(text):
             levelNameNode.text = text
             levelNameSize = levelNameNode.getMediaSize()
-            bgImage.size = levelNameSize + Point2D(40, 40) * g_scale
-            levelNameDiv.pos = parentNode.size / 2 - bgImage.size / 2
+            bgImage.size = levelNameSize + Point2D(40, 40)
+            levelNameDiv.pos = self.gameDiv.size / 2 - bgImage.size / 2
             levelNameDiv.opacity = 1
             avg.fadeOut(levelNameDiv, 6000)
         self.__levelNameHandler = setLevelName
 
-        self.levelMenu = LevelMenu(parentNode, self.__levels, self.__curLevel,
-                self.switchLevel)
+        hudSize = self.__layOut(parentNode.size)
+        self.levelMenu = LevelMenu(hudDiv, hudSize, self.__numLevels,
+                self.__levelPack.getName, self.__unlockedLevels, self.switchLevel)
         self.aboutBox = AboutBox(self.levelMenu.menuSize, self.levelMenu.listHeight,
-                parent=parentNode)
+                size=hudSize, parent=hudDiv)
+        parentNode.subscribe(parentNode.SIZE_CHANGED, self.__onResize)
 
         self.level = Level(self)
+        self.__prefetcher = Prefetcher(self.__prepareGame)
+        if sessionWriter is not None:
+            self.__initRecording()
         self.__startNextLevel()
 
-    def getEdges(self):
-        return self.level.edges
+    def __initRecording(self):
+        eventTypes = {
+            avg.CURSORDOWN: recorder.CURSOR_DOWN,
+            avg.CURSORMOTION: recorder.CURSOR_MOTION,
+            avg.CURSORUP: recorder.CURSOR_UP,
+        }
+        previousHook = player.getEventHook()
+
+        def onEvent(event):
+            type_ = eventTypes.get(event.type)
+            if type_ is not None:
+                # the log is in level coordinates, like the board
+                pos = self.gameDiv.getRelPos(event.pos)
+                if type_ == recorder.CURSOR_UP:
+                    speed = self.gameDiv.getRelPos(event.speed) - self.gameDiv.getRelPos((0, 0))
+                else:
+                    speed = Point2D(0, 0)
+                self.__sessionWriter.writeCursorEvent(type_, event.cursorid,
+                        pos.x, pos.y, speed.x, speed.y)
+            if previousHook is not None:
+                return previousHook(event)
+            return False
+        player.setEventHook(onEvent)
+
+    def __layOut(self, size):
+        """scale and center the board in an area of size, keeping its
+        aspect ratio, and stretch the HUD over all of it at the same scale"""
+        scale = min(size.x / BASE_SIZE[0], size.y / BASE_SIZE[1])
+        self.__background.size = size
+        self.gameDiv.scale = (scale, scale)
+        self.gameDiv.pos = (size - Point2D(BASE_SIZE) * scale) / 2
+        hudSize = size / scale
+        self.__hudDiv.scale = (scale, scale)
+        self.winnerDiv.pos = (hudSize - self.winnerDiv.getMediaSize()) / 2
+        self.__statusNode.pos = (hudSize.x - 50, 50)
+        return hudSize
+
+    def __onResize(self, size):
+        hudSize = self.__layOut(size)
+        self.levelMenu.resize(hudSize)
+        self.aboutBox.resize(hudSize)
 
     def updateStatus(self):
         self.__statusHandler(self.level.getStatus())
 
+    def __getSavedLevel(self):
+        """the furthest level unlocked in the progress store"""
+        if not self.__ds.data:
+            return 0
+        return self.__levelHashes.find(self.__ds.data) or 0
+
     def switchLevel(self, levelIndex):
         self.__curLevel = levelIndex
         self.levelWon(False)
 
     def __startNextLevel(self):
-        self.__curLevel %= len(self.__levels)
-        level = self.__levels[self.__curLevel]
-        self.level.start(level)
+        self.__curLevel %= self.__numLevels
+        if self.__sessionWriter is not None:
+            self.__sessionWriter.writeLevelStart(self.__curLevel, *BASE_SIZE)
+        self.level.start(self.__prefetcher.get(self.__curLevel))
         self.__levelNameHandler(self.level.getName())
         self.__curLevel += 1
+        self.__prefetcher.request(self.__curLevel % self.__numLevels)
+
+    def __prepareGame(self, levelIdx):
+        """decode a level and compute its initial clashes; runs in the
+        prefetcher's thread"""
+        profiler = profiling.profiler
+        with profiler.timer('levelDecode'):
+            levelData = centerLevel(self.__levelPack.getLevel(levelIdx), BASE_SIZE)
+        with profiler.timer('levelBuild'):
+            game = Game(levelData)
+        game.prepare()
+        return game
 
     def levelWon(self, showWinnerDiv=True):
         def nextLevel():
@@ -533,11 +766,12 @@ class GameController(object):
                 avg.fadeOut(self.winnerDiv, 400)
             avg.fadeIn(self.gameDiv, 400)
         self.level.pause()
-        level = self.__levels[self.__curLevel]
-        if level['menuItem'].color == '7f7f7f':
-            # unlock level
-            level['menuItem'].color = 'ffffff'
-            self.__ds.data = level['hash']
+        levelIdx = self.__curLevel % self.__numLevels
+        if levelIdx not in self.__unlockedLevels:
+            self.__unlockedLevels.add(levelIdx)
+            # boards sharing the store only ever move the progress forward
+            if levelIdx > self.__getSavedLevel():
+                self.__ds.data = self.__levelHashes[levelIdx]
         if showWinnerDiv:
             avg.fadeIn(self.winnerDiv, 600)
             avg.fadeOut(self.gameDiv, 600, lambda: player.setTimeout(1000, nextLevel))
@@ -545,72 +779,35 @@ class GameController(object):
             avg.fadeOut(self.gameDiv, 600, nextLevel)
 
     def groupVertices(self, polygon):
-        vertices = set(self.level.getEnclosedVertices(polygon))
-        newGroup = vertices - self._groupedVertices
-        self._groupedVertices = self._groupedVertices.union(newGroup)
-        for vertex in newGroup:
-            vertex.highlight(True)
-            vertex.draggable = False
-        return list(newGroup)
+        return self.level.groupVertices(polygon)
 
     def ungroupVertices(self, vertices):
-        for vertex in vertices:
-            vertex.highlight(False)
-            vertex.draggable = True
-        self._groupedVertices -= set(vertices)
+        self.level.ungroupVertices(vertices)
 
     def _onDraw(self, event):
         GroupDetector(self, event)
         return False
 
-    def __loadLevels(self, size):
-        fp = gzip.open(getMediaDir(__file__, 'data/levels.pickle.gz'))
-        levels = cPickle.load(fp)
-        fp.close()
-
-        currentLevel = None
-        savedHash = self.__ds.data
-        levelHash = md5(self.__ds._getUserDataPath())
-        for levelIdx, level in enumerate(levels):
-            vertices = level['vertices']
-            minPos = Point2D(size)
-            maxPos = Point2D(0, 0)
-            for i in xrange(len(vertices)):
-                levelHash.update(str(vertices[i]))
-                vertices[i] = Point2D(vertices[i][0]*g_scale, vertices[i][1]*g_scale)
-                if vertices[i].x < minPos.x:
-                    minPos.x = vertices[i].x
-                if vertices[i].y < minPos.y:
-                    minPos.y = vertices[i].y
-                if vertices[i].x > maxPos.x:
-                    maxPos.x = vertices[i].x
-                if vertices[i].y > maxPos.y:
-                    maxPos.y = vertices[i].y
-            level['hash'] = levelHash.hexdigest()
-            if currentLevel is None and level['hash'] == savedHash:
-                currentLevel = levelIdx
-
-            # center level on screen
-            levelSize = maxPos - minPos
-            levelOffset = (size - levelSize) / 2 - minPos
-            for i in xrange(len(vertices)):
-                vertices[i] += levelOffset
-
-        return levels, 0 if currentLevel is None else currentLevel
-
 
 class LevelMenu(object):
+    """Scrollable list of the levels. Only NUM_ROWS text nodes exist; as
+    the list scrolls, they are moved and relabeled to show the levels in
+    view, so the menu costs the same for any number of levels."""
     VISIBLE_LEVELS = 11
+    # one spare row above and below the visible ones while scrolling
+    NUM_ROWS = VISIBLE_LEVELS + 2
 
-    def __init__(self, parentNode, levels, curLevel, callback):
+    def __init__(self, parentNode, size, numLevels, getLevelName, unlockedLevels, callback):
         # main div catches all clicks and disables game underneath
         mainDiv = player.createNode('div', {
-                'size':parentNode.size,
+                'size':size,
                 'active':False,
                 'opacity':0})
         parentNode.appendChild(mainDiv)
+        # set while the menu is open
+        self.__frameHandlerID = None
 
-        fontSize = round(16 * g_scale)
+        fontSize = 16
         itemHeight = fontSize * 3
         self.listHeight = itemHeight * self.VISIBLE_LEVELS
 
@@ -619,6 +816,8 @@ class LevelMenu(object):
                 'pos':(mainDiv.size-self.menuSize)/2,
                 'size':self.menuSize})
         mainDiv.appendChild(menuDiv)
+        self.__mainDiv = mainDiv
+        self.__menuDiv = menuDiv
 
         bgImage = player.createNode('image', {
                 'href':'menubg.png',
@@ -640,17 +839,36 @@ class LevelMenu(object):
                 'sensitive':False})
         listFrameDiv.appendChild(listDiv)
 
-        pos = Point2D(listFrameDiv.width/2, 0)
-        for levelIdx, level in enumerate(levels):
-            menuItem = player.createNode('words', {
-                    'text':level['name'],
+        rows = []
+        for rowIdx in xrange(self.NUM_ROWS):
+            row = player.createNode('words', {
+                    'text':getLevelName(0),
                     'fontsize':fontSize,
-                    'color':'7f7f7f' if levelIdx > curLevel else 'ffffff',
-                    'alignment':'center'})
-            menuItem.pos = pos + Point2D(0, (itemHeight-menuItem.getMediaSize().y)/2)
-            level['menuItem'] = menuItem
-            listDiv.appendChild(menuItem)
-            pos.y += itemHeight
+                    'alignment':'center',
+                    'active':False})
+            listDiv.appendChild(row)
+            rows.append(row)
+        # all names are set in one line of the same font
+        textPos = Point2D(listFrameDiv.width/2, (itemHeight-rows[0].getMediaSize().y)/2)
+        # level shown by each row, or None
+        rowLevels = [None] * self.NUM_ROWS
+
+        def updateRows(force=False):
+            firstLevel = max(0, int(math.floor(-listDiv.pos.y / itemHeight)))
+            for levelIdx in xrange(firstLevel, firstLevel + self.NUM_ROWS):
+                rowIdx = levelIdx % self.NUM_ROWS
+                if rowLevels[rowIdx] == levelIdx and not force:
+                    continue
+                row = rows[rowIdx]
+                if levelIdx < numLevels:
+                    row.text = getLevelName(levelIdx)
+                    row.color = 'ffffff' if levelIdx in unlockedLevels else '7f7f7f'
+                    row.pos = textPos + Point2D(0, levelIdx * itemHeight)
+                    row.active = True
+                    rowLevels[rowIdx] = levelIdx
+                else:
+                    row.active = False
+                    rowLevels[rowIdx] = None
 
         separatorLine = player.createNode('line', {
                 'pos1':(0, self.listHeight),
@@ -658,24 +876,36 @@ class LevelMenu(object):
         menuDiv.appendChild(separatorLine)
 
         listDivMaxPos = selectionBg.pos.y
-        listDivMinPos = -pos.y + listDivMaxPos + itemHeight
+        listDivMinPos = listDivMaxPos - (numLevels-1) * itemHeight
 
         def onOpen(levelIndex):
             mainDiv.active = True
+            mainDiv.sensitive = True
             self.__selectedLevelIndex = levelIndex
             listDiv.pos = (0, listDivMaxPos - levelIndex * itemHeight)
             selectionBg.fillopacity = 0.5
             self.__motionDiff = 0
             self.__lastTargetPos = listDiv.pos.y
+            # levels may have been unlocked since the menu was last open
+            updateRows(True)
+            self.__frameHandlerID = player.subscribe(player.ON_FRAME, updateRows)
             avg.fadeIn(mainDiv, 400)
         self.__onOpenHandler = onOpen
 
         def onClose():
             def setInactive():
                 mainDiv.active = False
+            if self.__frameHandlerID is None:
+                return
+            player.unsubscribe(self.__frameHandlerID)
+            self.__frameHandlerID = None
+            # taps during the fade must not close or start anything twice
+            mainDiv.sensitive = False
             avg.fadeOut(mainDiv, 400, setInactive)
 
         def onStart():
+            if self.__frameHandlerID is None:
+                return
             callback(self.__selectedLevelIndex)
             onClose()
 
@@ -691,7 +921,7 @@ class LevelMenu(object):
                 self.__motionDiff -= motion
                 self.__lastTargetPos = pos[1]
                 self.__selectedLevelIndex = int((listDivMaxPos-self.__lastTargetPos) / itemHeight)
-                if levels[self.__selectedLevelIndex]['menuItem'].color == 'ffffff':
+                if self.__selectedLevelIndex in unlockedLevels:
                     startBtn.setActive(True)
                     avg.LinearAnim(selectionBg, 'fillopacity', 200,
                             selectionBg.fillopacity, 0.5).start()
@@ -701,15 +931,20 @@ class LevelMenu(object):
                             selectionBg.fillopacity, 0).start()
 
         MoveButton(listFrameDiv, onUpDown, onUpDown, onMotion)
-        startBtn = LabelButton(menuDiv, 'start level', 20*g_scale, onStart)
+        startBtn = LabelButton(menuDiv, 'start level', 20, onStart)
         startBtn.setPos((itemHeight*2, self.listHeight+(itemHeight-startBtn.size.y)/2))
-        closeBtn = LabelButton(menuDiv, 'close menu', 20*g_scale, onClose)
+        closeBtn = LabelButton(menuDiv, 'close menu', 20, onClose)
         closeBtn.setPos((menuDiv.width-itemHeight*2-closeBtn.size.x,
                 self.listHeight+(itemHeight-closeBtn.size.y)/2))
 
     def open(self, levelIndex):
         self.__onOpenHandler(levelIndex)
 
+    def resize(self, size):
+        """cover an area of size and center the menu in it"""
+        self.__mainDiv.size = size
+        self.__menuDiv.pos = (size - self.menuSize) / 2
+
 
 class AboutBox(avg.DivNode):
     ABOUT_TEXT = [
@@ -725,13 +960,13 @@ class AboutBox(avg.DivNode):
     ]
 
     def __init__(self, boxSize, aboutHeight, parent=None, **kwargs):
-        kwargs['size'] = parent.size
         kwargs['active'] = False
         kwargs['opacity'] = 0
         super(AboutBox, self).__init__(**kwargs)
         self.registerInstance(self, parent)
 
         boxDiv = avg.DivNode(pos=(self.size-boxSize)/2, size=boxSize, parent=self)
+        self.__boxDiv = boxDiv
         avg.ImageNode(href='menubg.png', size=boxSize, parent=boxDiv)
         avg.LineNode(pos1=(0, aboutHeight), pos2=(boxSize.x, aboutHeight), parent=boxDiv)
 
@@ -740,7 +975,7 @@ class AboutBox(avg.DivNode):
                 self.active = False
             avg.fadeOut(self, 400, setInactive)
 
-        closeBtn = LabelButton(boxDiv, 'close about', 20*g_scale, onClose)
+        closeBtn = LabelButton(boxDiv, 'close about', 20, onClose)
         closeBtn.setPos(((boxDiv.width-closeBtn.size.x) / 2,
                 aboutHeight + (boxSize.y-aboutHeight-closeBtn.size.y) / 2))
 
@@ -748,7 +983,7 @@ class AboutBox(avg.DivNode):
                 parent=boxDiv)
         pos = Point2D(aboutDiv.width / 2, 0)
         for size, txt in self.ABOUT_TEXT:
-            node = avg.WordsNode(text=txt, pos=pos, fontsize=size*g_scale,
+            node = avg.WordsNode(text=txt, pos=pos, fontsize=size,
                     alignment='center', parent=aboutDiv)
             pos.y += node.height + node.getLineExtents(0).y
         aboutDiv.pos = (0, (aboutHeight - pos.y) / 2)
@@ -757,15 +992,106 @@ class AboutBox(avg.DivNode):
         self.active = True
         avg.fadeIn(self, 400)
 
+    def resize(self, size):
+        """cover an area of size and center the box in it"""
+        self.size = size
+        self.__boxDiv.pos = (size - self.__boxDiv.size) / 2
+
 
 class Planarity(app.MainDiv):
+    batchRendering = False
+    profilePath = profiling.getTracePath()
+    recordPath = None
+    numBoards = 1
+
+    def onArgvParserCreated(self, parser):
+        parser.add_option('--batch-rendering', dest='batchRendering',
+                action='store_true', default=False,
+                help='draw all edges and all clash markers with one mesh node each')
+        parser.add_option('--profile', dest='profilePath', metavar='FILE',
+                help='count and time the hot paths, show the numbers in an overlay '
+                '(toggled with p) and write them to FILE (.json or .csv) on exit; '
+                'also enabled by the %s environment variable' % profiling.ENV_VAR)
+        parser.add_option('--record', dest='recordPath', metavar='FILE',
+                help='record all cursor events to the session log FILE, for '
+                'replaying with python -m planarity.recorder')
+        parser.add_option('--boards', dest='numBoards', metavar='N', type='int',
+                default=1, help='play on N boards side by side, e.g. on a wall '
+                'of screens; they share the level data and the progress')
+
+    def onArgvParsed(self, options, args, parser):
+        self.batchRendering = options.batchRendering
+        if options.profilePath:
+            self.profilePath = options.profilePath
+            profiling.enable()
+        self.recordPath = options.recordPath
+        if options.numBoards < 1:
+            parser.error('--boards needs at least one board')
+        if options.numBoards > 1 and self.recordPath:
+            parser.error('--record works with one board only')
+        self.numBoards = options.numBoards
+
     def onInit(self):
         self.mediadir = getMediaDir(__file__)
 
-        global g_scale
-        g_scale = min(self.size.x / BASE_SIZE[0], self.size.y / BASE_SIZE[1])
-        self.__controller = GameController(self, onExit = player.stop)
-
-
-if __name__ == '__main__':
-    app.App().run(Planarity())
+        self.__sessionWriter = None
+        if self.recordPath:
+            self.__sessionWriter = recorder.SessionWriter(self.recordPath)
+        progressStore = openProgressStore()
+        self.__boardDivs = [avg.DivNode(crop=True, parent=self)
+                for boardIdx in xrange(self.numBoards)]
+        self.__overlay = None
+        self.__layOut(self.size)
+        self.__controllers = []
+        for boardDiv in self.__boardDivs:
+            self.__controllers.append(GameController(boardDiv, onExit = player.stop,
+                    batchRendering=self.batchRendering,
+                    sessionWriter=self.__sessionWriter,
+                    progressStore=progressStore))
+        if profiling.profiler.enabled:
+            self.__initProfilingOverlay()
+        self.subscribe(self.SIZE_CHANGED, self.__layOut)
+
+    def __layOut(self, size):
+        """split size among the boards, which lay themselves out when
+        their size changes"""
+        boardSize = Point2D(size.x / self.numBoards, size.y)
+        for boardIdx, boardDiv in enumerate(self.__boardDivs):
+            boardDiv.pos = (boardIdx * boardSize.x, 0)
+            boardDiv.size = boardSize
+        if self.__overlay is not None:
+            scale = min(size.x / BASE_SIZE[0], size.y / BASE_SIZE[1])
+            self.__overlay.pos = Point2D(50, 250)*scale
+            self.__overlay.fontsize = 14*scale
+
+    def __initProfilingOverlay(self):
+        overlay = player.createNode('words', {
+                'color':'00ff00',
+                'active':False,
+                'sensitive':False})
+        self.appendChild(overlay)
+        self.__overlay = overlay
+        self.__layOut(self.size)
+
+        def onFrame():
+            frame = profiling.profiler.endFrame()
+            if overlay.active:
+                lines = []
+                for name, value in sorted(frame.items()):
+                    if name.endswith('Time'):
+                        lines.append('%s: %.2f ms' % (name, value * 1000))
+                    else:
+                        lines.append('%s: %u' % (name, value))
+                overlay.text = '<br/>'.join(lines)
+        player.subscribe(player.ON_FRAME, onFrame)
+
+        def toggleOverlay():
+            overlay.active = not overlay.active
+        app.keyboardmanager.bindKeyDown(keystring='p', handler=toggleOverlay,
+                help='toggle the profiling overlay')
+
+    def onExit(self):
+        if self.profilePath:
+            profiling.profiler.dump(self.profilePath)
+        if self.__sessionWriter is not None:
+            self.__sessionWriter.close()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026
+#    The planarity contributors
+#
+# planarity (aka untangle) is free software: you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# planarity is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with planarity.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Opt-in counters and timers for the hot paths.
+
+Instrumented code calls profiling.profiler.count() and .timer(). Until
+enable() is called, profiler is a NullProfiler whose methods do nothing,
+so instrumentation is placed per batch (per update, per kernel call),
+never per segment pair. Setting the PLANARITY_PROFILE environment
+variable to a .json or .csv file name enables profiling at import time;
+the game also has a --profile option.
+"""
+
+import csv
+import json
+import os
+import threading
+import time
+
+ENV_VAR = 'PLANARITY_PROFILE'
+
+
+class _NullTimer(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class NullProfiler(object):
+    enabled = False
+
+    def count(self, name, number=1):
+        pass
+
+    def timer(self, name):
+        return _NullTimer()
+
+    def endFrame(self):
+        pass
+
+
+class _Timer(object):
+    def __init__(self, profiler, name):
+        self.__profiler = profiler
+        self.__name = name
+
+    def __enter__(self):
+        self.__start = time.time()
+        return self
+
+    def __exit__(self, *args):
+        self.__profiler.addTime(self.__name, time.time() - self.__start)
+
+
+class Profiler(object):
+    """Collects counts and times (in seconds) per frame. Frames in which
+    something was recorded are kept as the trace."""
+    enabled = True
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__counts = {}
+        self.__times = {}
+        self.__frameStart = time.time()
+        self.numFrames = 0
+        self.lastFrame = {}
+        self.trace = []
+
+    def count(self, name, number=1):
+        with self.__lock:
+            self.__counts[name] = self.__counts.get(name, 0) + number
+
+    def addTime(self, name, seconds):
+        with self.__lock:
+            self.__times[name] = self.__times.get(name, 0.0) + seconds
+
+    def timer(self, name):
+        """return a context manager adding the time spent in it to name"""
+        return _Timer(self, name)
+
+    def endFrame(self):
+        """close the current frame and return its record"""
+        now = time.time()
+        with self.__lock:
+            counts, self.__counts = self.__counts, {}
+            times, self.__times = self.__times, {}
+        frame = {'frame': self.numFrames, 'frameTime': now - self.__frameStart}
+        frame.update(counts)
+        for name, seconds in times.items():
+            frame[name + 'Time'] = seconds
+        if counts or times:
+            self.trace.append(frame)
+        self.lastFrame = frame
+        self.numFrames += 1
+        self.__frameStart = now
+        return frame
+
+    def getSummary(self):
+        """return totals over the trace"""
+        totals = {}
+        for frame in self.trace:
+            for name, value in frame.items():
+                if name not in ('frame', 'frameTime'):
+                    totals[name] = totals.get(name, 0) + value
+        totals['frames'] = self.numFrames
+        return totals
+
+    def dump(self, path):
+        """write the trace to path, as CSV if it ends with .csv and as JSON
+        otherwise"""
+        if path.endswith('.csv'):
+            names = sorted(set(name for frame in self.trace for name in frame)
+                    - set(['frame', 'frameTime']))
+            with open(path, 'w') as fp:
+                writer = csv.writer(fp)
+                writer.writerow(['frame', 'frameTime'] + names)
+                for frame in self.trace:
+                    writer.writerow([frame['frame'], frame['frameTime']] +
+                            [frame.get(name, 0) for name in names])
+        else:
+            with open(path, 'w') as fp:
+                json.dump({'summary': self.getSummary(), 'frames': self.trace},
+                        fp, indent=1, sort_keys=True)
+
+
+profiler = NullProfiler()
+
+
+def enable():
+    """switch instrumentation on and return the Profiler"""
+    global profiler
+    if not profiler.enabled:
+        profiler = Profiler()
+    return profiler
+
+
+def getTracePath():
+    """return the trace file name from the environment, or None"""
+    return os.environ.get(ENV_VAR) or None
+
+
+if getTracePath():
+    enable()
@@ -0,0 +1,400 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026
+#    The planarity contributors
+#
+# planarity (aka untangle) is free software: you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# planarity is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with planarity.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Recording and headless replay of play sessions.
+
+A session log starts with an 8 byte magic and a uint32 version, followed
+by fixed size little-endian records:
+
+    time        uint32, milliseconds since the recording started
+    type        uint8, one of CURSOR_DOWN, CURSOR_MOTION, CURSOR_UP and
+                LEVEL_START
+    cursorid    uint32; the level number for LEVEL_START
+    x, y        float32, the cursor position in board coordinates; the
+                board size for LEVEL_START
+    speedX, speedY
+                float32, the cursor speed of CURSOR_UP events, else 0
+
+The game records its BASE_SIZE board in level coordinates, whatever the
+window size. Older logs have the window as the board and window
+coordinates, with the level scaled to fit; both replay the same way.
+
+Replayer feeds a log through core.Game without libavg, as fast as
+possible. It mimics the libavg input handling of the game: vertex and
+group dragging with their clamping and inertia, lassos and group close
+buttons. The stacking order of vertex nodes is approximated by vertex
+number, so replays of overlapping vertices can differ from the session.
+
+Replay a log with
+
+    python -m planarity.recorder session.log
+"""
+
+import math
+import os
+import struct
+import sys
+import time
+
+from .core import Game, Lasso
+from .geometry import pointsInPolygon
+from .levelpack import BASE_SIZE, LevelPack, centerLevel
+
+MAGIC = b'PLNRSESS'
+VERSION = 1
+HEADER = struct.Struct('<8sI')
+RECORD = struct.Struct('<IBIffff')
+
+CURSOR_DOWN, CURSOR_MOTION, CURSOR_UP, LEVEL_START = range(4)
+
+# these mirror the game: the sizes of media/vertex.png and
+# media/close-button.png, GroupDetector.CELL_SIZE and the Game cell size
+VERTEX_SIZE = 50
+CLOSE_BUTTON_SIZE = 20
+LASSO_CELL_SIZE = 32
+MIN_CELL_SIZE = 16
+
+
+class SessionLogError(Exception):
+    pass
+
+
+class SessionWriter(object):
+    """Appends events to a new session log, timestamped on arrival."""
+    def __init__(self, path):
+        self.__fp = open(path, 'wb')
+        self.__fp.write(HEADER.pack(MAGIC, VERSION))
+        self.__start = time.time()
+
+    def __write(self, type_, cursorid, x, y, speedX=0, speedY=0):
+        millis = int((time.time() - self.__start) * 1000)
+        self.__fp.write(RECORD.pack(millis, type_, cursorid, x, y, speedX, speedY))
+
+    def writeCursorEvent(self, type_, cursorid, x, y, speedX=0, speedY=0):
+        self.__write(type_, cursorid, x, y, speedX, speedY)
+
+    def writeLevelStart(self, levelIdx, width, height):
+        self.__write(LEVEL_START, levelIdx, width, height)
+
+    def close(self):
+        self.__fp.close()
+
+
+def readSession(path):
+    """return the records of a session log as a list of (time, type,
+    cursorid, x, y, speedX, speedY) tuples"""
+    with open(path, 'rb') as fp:
+        data = fp.read()
+    if len(data) < HEADER.size:
+        raise SessionLogError('%s: not a session log' % path)
+    magic, version = HEADER.unpack(data[:HEADER.size])
+    if magic != MAGIC:
+        raise SessionLogError('%s: not a session log' % path)
+    if version != VERSION:
+        raise SessionLogError('%s: unsupported session log version %u' % (path, version))
+    # a recording cut short may end with a partial record
+    end = HEADER.size + (len(data) - HEADER.size) // RECORD.size * RECORD.size
+    return [RECORD.unpack_from(data, offset)
+            for offset in range(HEADER.size, end, RECORD.size)]
+
+
+def _round(value):
+    # round half away from zero, like Python 2 does in MoveButton
+    return math.copysign(math.floor(abs(value) + 0.5), value)
+
+
+def _getDelta(motion, topLeft, bottomRight, boardSize):
+    return (min(max(motion[0], -topLeft[0]), boardSize[0] - bottomRight[0]),
+            min(max(motion[1], -topLeft[1]), boardSize[1] - bottomRight[1]))
+
+
+class _Draggable(object):
+    """MoveButton: motion of the captured cursor, and inertia after it is
+    released, reported to onMotion like MoveButton does"""
+    def __init__(self, onMotion):
+        self.__onMotionCallback = onMotion
+        self.cursorid = None
+        self.lastPos = None
+        self.speed = None
+        self.motionDiff = None
+
+    def press(self, cursorid, pos):
+        self.speed = None
+        self.cursorid = cursorid
+        self.lastPos = pos
+
+    def drag(self, pos):
+        motion = (pos[0] - self.lastPos[0], pos[1] - self.lastPos[1])
+        if motion[0] or motion[1]:
+            self.lastPos = pos
+            self.__onMotionCallback(motion)
+
+    def release(self, speed):
+        self.cursorid = None
+        if speed[0] or speed[1]:
+            self.speed = (speed[0] * 10.0, speed[1] * 10.0)
+            self.motionDiff = (0.0, 0.0)
+
+    def tick(self, numTicks):
+        """numTicks inertia steps with their motion summed, like the
+        InertiaTicker runs them each frame; return False once the inertia
+        is over"""
+        speedX, speedY = self.speed
+        diffX, diffY = self.motionDiff
+        for tick in range(numTicks):
+            speedX, speedY = speedX * 0.95, speedY * 0.95
+            if math.hypot(speedX, speedY) < 1:
+                self.speed = None
+                break
+            diffX, diffY = diffX + speedX, diffY + speedY
+        else:
+            self.speed = (speedX, speedY)
+        motion = (_round(diffX), _round(diffY))
+        self.motionDiff = (diffX - motion[0], diffY - motion[1])
+        if motion[0] or motion[1]:
+            self.__onMotionCallback(motion)
+        return self.speed is not None
+
+
+class _Vertex(_Draggable):
+    def __init__(self, replayer, index):
+        super(_Vertex, self).__init__(self.__onMotion)
+        self.replayer = replayer
+        self.index = index
+
+    def getTopLeft(self):
+        x, y = self.replayer.game.graph.getPos(self.index)
+        halfSize = self.replayer.vertexSize / 2.0
+        return x - halfSize, y - halfSize
+
+    def hit(self, pos):
+        left, top = self.getTopLeft()
+        size = self.replayer.vertexSize
+        return left <= pos[0] < left + size and top <= pos[1] < top + size
+
+    def __onMotion(self, motion):
+        game = self.replayer.game
+        if game.isGrouped(self.index):
+            return
+        left, top = self.getTopLeft()
+        size = self.replayer.vertexSize
+        dx, dy = _getDelta(motion, (left, top), (left + size, top + size),
+                self.replayer.boardSize)
+        x, y = game.graph.getPos(self.index)
+        game.moveVertex(self.index, x + dx, y + dy)
+
+
+class _Group(_Draggable):
+    def __init__(self, replayer, polygon, vertices):
+        super(_Group, self).__init__(self.__onMotion)
+        self.replayer = replayer
+        self.polygon = polygon
+        self.vertices = vertices
+        graph = replayer.game.graph
+        xs = [graph.getPos(vertex)[0] for vertex in vertices]
+        ys = [graph.getPos(vertex)[1] for vertex in vertices]
+        halfSize = replayer.vertexSize / 2.0
+        self.topLeft = (min(xs) - halfSize, min(ys) - halfSize)
+        self.bottomRight = (max(xs) + halfSize, max(ys) + halfSize)
+        halfSize = replayer.closeButtonSize / 2.0
+        self.buttonPos = (polygon[0][0] - halfSize, polygon[0][1] - halfSize)
+
+    def hitButton(self, pos):
+        x, y = self.buttonPos
+        size = self.replayer.closeButtonSize
+        return x <= pos[0] < x + size and y <= pos[1] < y + size
+
+    def hit(self, pos):
+        return pointsInPolygon([pos[0]], [pos[1]], self.polygon)[0]
+
+    def __onMotion(self, motion):
+        dx, dy = _getDelta(motion, self.topLeft, self.bottomRight,
+                self.replayer.boardSize)
+        self.replayer.game.translateVertices(self.vertices, dx, dy)
+        self.polygon = [(x + dx, y + dy) for x, y in self.polygon]
+        self.buttonPos = (self.buttonPos[0] + dx, self.buttonPos[1] + dy)
+        self.topLeft = (self.topLeft[0] + dx, self.topLeft[1] + dy)
+        self.bottomRight = (self.bottomRight[0] + dx, self.bottomRight[1] + dy)
+
+
+class Replayer(object):
+    """Plays session logs against the levels of a level pack."""
+    FRAME_TIME = 1000 / 60.0
+    TICK_TIME = 10
+
+    def __init__(self, levelPack):
+        self.__levelPack = levelPack
+        self.game = None
+
+    def replay(self, records):
+        """Feed records through the game logic and return statistics."""
+        self.game = None
+        self.numEvents = self.numFrames = self.numLevels = self.numWins = 0
+        self.__nextFrameTime = None
+        # time of the next inertia tick, set when something starts coasting
+        self.__tickTime = 0
+        start = time.time()
+        for millis, type_, cursorid, x, y, speedX, speedY in records:
+            while self.__nextFrameTime is not None and millis >= self.__nextFrameTime:
+                self.__runFrame()
+                if self.__moving:
+                    # inertia goes on in the frames between events
+                    self.__nextFrameTime += self.FRAME_TIME
+                else:
+                    self.__nextFrameTime = (math.floor(millis / self.FRAME_TIME) + 1) * self.FRAME_TIME
+            if type_ == LEVEL_START:
+                self.__startLevel(cursorid, (x, y))
+                self.__nextFrameTime = millis + self.FRAME_TIME
+            elif self.game is not None:
+                self.numEvents += 1
+                if type_ == CURSOR_DOWN:
+                    self.__onDown(cursorid, (x, y))
+                elif type_ == CURSOR_MOTION:
+                    self.__onMotion(cursorid, (x, y))
+                elif type_ == CURSOR_UP:
+                    self.__onUp(cursorid, (x, y), (speedX, speedY))
+        if self.game is not None:
+            self.__runFrame()
+            # let the vertices that are still coasting come to rest
+            while self.__moving:
+                self.__nextFrameTime += self.FRAME_TIME
+                self.__runFrame()
+        seconds = time.time() - start
+        return {
+            'events': self.numEvents,
+            'frames': self.numFrames,
+            'levels': self.numLevels,
+            'wins': self.numWins,
+            'clashes': self.game.getNumClashes() if self.game else None,
+            'seconds': seconds,
+            'eventsPerSec': self.numEvents / seconds if seconds else None,
+        }
+
+    def __startLevel(self, levelIdx, boardSize):
+        scale = min(boardSize[0] / BASE_SIZE[0], boardSize[1] / BASE_SIZE[1])
+        self.boardSize = boardSize
+        self.vertexSize = VERTEX_SIZE * scale
+        self.closeButtonSize = CLOSE_BUTTON_SIZE * scale
+        self.__lassoCellSize = LASSO_CELL_SIZE * scale
+        levelData = centerLevel(self.__levelPack.getLevel(levelIdx), boardSize, scale)
+        self.game = Game(levelData, MIN_CELL_SIZE * scale)
+        self.game.subscribe(Game.WON, self.__onWon)
+        self.game.start()
+        self.__vertices = [_Vertex(self, index)
+                for index in range(self.game.graph.numVertices)]
+        self.__groups = []
+        self.__lassos = {}
+        self.__grabbed = {}
+        self.__moving = []
+        self.numLevels += 1
+
+    def __onWon(self):
+        self.numWins += 1
+        self.game.pause()
+
+    def __runFrame(self):
+        numTicks = int((self.__nextFrameTime - self.__tickTime) // self.TICK_TIME)
+        self.__tickTime += numTicks * self.TICK_TIME
+        if numTicks:
+            self.__moving = [draggable for draggable in self.__moving
+                    if draggable.speed is not None and draggable.tick(numTicks)]
+        self.game.update()
+        self.numFrames += 1
+
+    def __press(self, draggable, cursorid, pos):
+        if draggable.cursorid is not None:
+            # a busy button lets the event through to the vertex div
+            self.__startLasso(cursorid, pos)
+            return
+        draggable.press(cursorid, pos)
+        self.__grabbed[cursorid] = draggable
+
+    def __onDown(self, cursorid, pos):
+        for group in reversed(self.__groups):
+            if group.hitButton(pos):
+                self.__deleteGroup(group)
+                # the close button doesn't stop the event
+                self.__startLasso(cursorid, pos)
+                return
+            if group.hit(pos):
+                self.__press(group, cursorid, pos)
+                return
+        for vertex in reversed(self.__vertices):
+            if vertex.hit(pos):
+                self.__press(vertex, cursorid, pos)
+                return
+        self.__startLasso(cursorid, pos)
+
+    def __onMotion(self, cursorid, pos):
+        draggable = self.__grabbed.get(cursorid)
+        if draggable is not None:
+            draggable.drag(pos)
+        elif cursorid in self.__lassos:
+            self.__addLassoPoint(cursorid, pos)
+
+    def __onUp(self, cursorid, pos, speed):
+        draggable = self.__grabbed.pop(cursorid, None)
+        if draggable is not None:
+            draggable.release(speed)
+            if draggable.speed is not None and draggable not in self.__moving:
+                if not self.__moving:
+                    self.__tickTime = self.__nextFrameTime
+                self.__moving.append(draggable)
+        self.__lassos.pop(cursorid, None)
+
+    def __startLasso(self, cursorid, pos):
+        self.__lassos[cursorid] = Lasso(self.__lassoCellSize)
+        self.__addLassoPoint(cursorid, pos)
+
+    def __addLassoPoint(self, cursorid, pos):
+        polygon = self.__lassos[cursorid].addPoint(pos)
+        if polygon:
+            vertices = self.game.groupVertices(polygon)
+            if vertices:
+                del self.__lassos[cursorid]
+                self.__groups.append(_Group(self, polygon, vertices))
+
+    def __deleteGroup(self, group):
+        self.__groups.remove(group)
+        for cursorid, draggable in list(self.__grabbed.items()):
+            if draggable is group:
+                del self.__grabbed[cursorid]
+        if group in self.__moving:
+            self.__moving.remove(group)
+        self.game.ungroupVertices(group.vertices)
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='Replay session logs headless.')
+    parser.add_argument('logs', nargs='+', metavar='LOG')
+    parser.add_argument('--pack', default=os.path.join(os.path.dirname(
+            os.path.abspath(__file__)), 'data', 'levels.pack'),
+            help='level pack the sessions were recorded with')
+    options = parser.parse_args(argv)
+
+    replayer = Replayer(LevelPack(options.pack))
+    for path in options.logs:
+        stats = replayer.replay(readSession(path))
+        sys.stdout.write('%s: %s\n' % (path, ', '.join('%s %s' % item
+                for item in sorted(stats.items()))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,390 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026
+#    The planarity contributors
+#
+# planarity (aka untangle) is free software: you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# planarity is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with planarity.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Bounds on the minimum number of clashes of a level, to set its goal.
+
+The crossing number of a graph is the sum of those of its biconnected
+blocks, so every block is bounded on its own:
+
+- the lower bound is 0 for planar blocks, else the larger of 1 and
+  E - 3V + 6 (each crossing can remove at most one edge above the planar
+  maximum of 3V - 6)
+- the upper bound is the fewest clashes found by a local search that
+  moves clashed vertices towards their neighbours, counting clashes with
+  core.Graph like the game does. It starts from a clash-free drawing of
+  a maximal planar subgraph if networkx is available, and from the
+  level's layout otherwise
+
+Blocks are cached under a canonical form, so blocks that occur in many
+levels (or many times in one) are only searched once. When both bounds
+meet the goal is exact ('='), otherwise it is the best layout found
+('*', meaning <=).
+
+solvePack() spreads the levels of a pack over worker processes.
+"""
+
+import json
+import math
+import multiprocessing
+import random
+
+from .core import Graph
+from .levelpack import getWorkerPack, initWorker
+
+try:
+    import networkx
+except ImportError:
+    networkx = None
+
+# blocks whose canonical form needs more labelings are not cached
+MAX_LABELINGS = 5040
+# random offset of searched positions, relative to the median edge length
+JITTER = 1e-3
+
+
+def getBlocks(numVertices, edges):
+    """Return the biconnected blocks of a simple graph as lists of edges,
+    in the vertex numbering of the graph. Bridges are blocks of their
+    own."""
+    neighbours = [[] for i in range(numVertices)]
+    for v1, v2 in edges:
+        neighbours[v1].append(v2)
+        neighbours[v2].append(v1)
+    order = [None] * numVertices
+    low = [0] * numVertices
+    blocks = []
+    counter = 0
+    for root in range(numVertices):
+        if order[root] is not None:
+            continue
+        order[root] = low[root] = counter
+        counter += 1
+        edgeStack = []
+        # iterative DFS; each frame is (vertex, parent, neighbour iterator)
+        stack = [(root, None, iter(neighbours[root]))]
+        while stack:
+            vertex, parent, children = stack[-1]
+            for child in children:
+                if order[child] is None:
+                    order[child] = low[child] = counter
+                    counter += 1
+                    edgeStack.append((vertex, child))
+                    stack.append((child, vertex, iter(neighbours[child])))
+                    break
+                if child != parent and order[child] < order[vertex]:
+                    edgeStack.append((vertex, child))
+                    low[vertex] = min(low[vertex], order[child])
+            else:
+                stack.pop()
+                if parent is not None:
+                    low[parent] = min(low[parent], low[vertex])
+                    if low[vertex] >= order[parent]:
+                        block = []
+                        while True:
+                            edge = edgeStack.pop()
+                            block.append(edge)
+                            if edge == (parent, vertex):
+                                break
+                        blocks.append(block)
+    return blocks
+
+
+def _relabel(edges):
+    """return (vertices, edges) with the vertices numbered from 0"""
+    numbers = {}
+    for edge in edges:
+        for vertex in edge:
+            if vertex not in numbers:
+                numbers[vertex] = len(numbers)
+    vertices = sorted(numbers, key=numbers.get)
+    return vertices, [(numbers[v1], numbers[v2]) for v1, v2 in edges]
+
+
+def getCanonicalForm(numVertices, edges):
+    """Return a string that is equal for two graphs exactly if they are
+    isomorphic, or None if that would take too long to compute.
+
+    Vertices are partitioned by color refinement; all labelings that keep
+    the partition in order are tried, and the smallest edge list wins."""
+    neighbours = [[] for i in range(numVertices)]
+    for v1, v2 in edges:
+        neighbours[v1].append(v2)
+        neighbours[v2].append(v1)
+    colors = [len(vertexNeighbours) for vertexNeighbours in neighbours]
+    while True:
+        signatures = [(colors[vertex], tuple(sorted(colors[other] for other in neighbours[vertex])))
+                for vertex in range(numVertices)]
+        ranks = dict((signature, rank) for rank, signature in enumerate(sorted(set(signatures))))
+        newColors = [ranks[signature] for signature in signatures]
+        if len(ranks) == len(set(colors)):
+            break
+        colors = newColors
+    classes = {}
+    for vertex in range(numVertices):
+        classes.setdefault(colors[vertex], []).append(vertex)
+    classes = [classes[color] for color in sorted(classes)]
+    numLabelings = 1
+    for vertexClass in classes:
+        numLabelings *= math.factorial(len(vertexClass))
+        if numLabelings > MAX_LABELINGS:
+            return None
+
+    best = None
+    for labeling in _getLabelings(classes):
+        numbers = dict((vertex, number) for number, vertex in enumerate(labeling))
+        form = sorted((min(numbers[v1], numbers[v2]), max(numbers[v1], numbers[v2]))
+                for v1, v2 in edges)
+        if best is None or form < best:
+            best = form
+    return '%u:%s' % (numVertices, ','.join('%u-%u' % edge for edge in best))
+
+
+def _getLabelings(classes):
+    from itertools import permutations, product
+    for parts in product(*[permutations(vertexClass) for vertexClass in classes]):
+        yield [vertex for part in parts for vertex in part]
+
+
+def checkPlanarity(numVertices, edges):
+    """Return (planar, method): planar is True or False, or None if
+    networkx is missing and the Euler bound doesn't decide it; method is
+    'networkx', 'euler' or None."""
+    if networkx is not None and hasattr(networkx, 'check_planarity'):
+        graph = networkx.Graph()
+        graph.add_nodes_from(range(numVertices))
+        graph.add_edges_from(edges)
+        return networkx.check_planarity(graph)[0], 'networkx'
+    if getLowerBound(numVertices, len(edges), None) > 0:
+        return False, 'euler'
+    return None, None
+
+
+def getLowerBound(numVertices, numEdges, planar):
+    """Lower bound on the crossing number of a simple graph, given whether
+    it is planar (None if unknown): every planar graph has at most 3V-6
+    edges, and each crossing can take one edge away."""
+    if planar:
+        return 0
+    bound = numEdges - (3 * numVertices - 6) if numVertices >= 3 else 0
+    if planar is False:
+        bound = max(bound, 1)
+    return max(bound, 0)
+
+
+def getPlanarStart(numVertices, edges):
+    """Return coordinates that draw a maximal planar subgraph without
+    clashes, as a start for searchLayout(), or None without networkx.
+    The subgraph is grown greedily in the order of edges, and the result
+    depends a lot on that order; the remaining edges are added as
+    straight lines."""
+    if networkx is None or not hasattr(networkx, 'combinatorial_embedding_to_pos'):
+        return None
+    graph = networkx.Graph()
+    graph.add_nodes_from(range(numVertices))
+    for edge in edges:
+        graph.add_edge(*edge)
+        if not networkx.check_planarity(graph)[0]:
+            graph.remove_edge(*edge)
+    embedding = networkx.check_planarity(graph)[1]
+    positions = networkx.combinatorial_embedding_to_pos(embedding)
+    return [(float(positions[vertex][0]), float(positions[vertex][1]))
+            for vertex in range(numVertices)]
+
+
+def searchLayout(coords, edges, rng, sweeps=20, lowerBound=0, numCandidates=6):
+    """Local search for a layout with few clashes, starting from coords.
+    Each sweep tries to move every clashed vertex to the barycenter of
+    its neighbours or to random spots around it or one of them, within a
+    radius shrinking from sweep to sweep. Return the fewest clashes found.
+
+    The clash check ignores collinear overlapping edges and coincident
+    vertices, so every position is offset at random by a small fraction
+    of the median edge length. That keeps the layout in general position,
+    where its clashes are a true upper bound; the grid from
+    getPlanarStart() and neighbour barycenters would not be."""
+    lengths = sorted(math.hypot(coords[v2][0] - coords[v1][0], coords[v2][1] - coords[v1][1])
+            for v1, v2 in edges)
+    maxSpread = lengths[len(lengths) // 2] or 1.0
+    jitter = maxSpread * JITTER
+
+    def getJittered(x, y):
+        return x + rng.uniform(-jitter, jitter), y + rng.uniform(-jitter, jitter)
+
+    graph = Graph([getJittered(x, y) for x, y in coords], edges)
+    graph.findClashes()
+    best = graph.getNumClashes()
+    neighbours = [[] for i in range(graph.numVertices)]
+    for v1, v2 in edges:
+        neighbours[v1].append(v2)
+        neighbours[v2].append(v1)
+
+    for sweep in range(sweeps):
+        spread = maxSpread * (1.0 - 0.9 * sweep / sweeps)
+        vertices = [vertex for vertex in range(graph.numVertices)
+                if graph.isVertexClashed(vertex)]
+        rng.shuffle(vertices)
+        for vertex in vertices:
+            if best <= lowerBound:
+                return best
+            positions = [graph.getPos(other) for other in neighbours[vertex]]
+            centerX = sum(x for x, y in positions) / len(positions)
+            centerY = sum(y for x, y in positions) / len(positions)
+            candidates = [getJittered(centerX, centerY)]
+            for i in range(numCandidates):
+                x, y = rng.choice(positions) if i % 2 else (centerX, centerY)
+                radius = spread * rng.random()
+                candidates.append(getJittered(x + rng.gauss(0, radius),
+                        y + rng.gauss(0, radius)))
+            bestPos, bestCount = graph.getPos(vertex), best
+            for x, y in candidates:
+                graph.moveVertex(vertex, x, y)
+                graph.update()
+                count = graph.getNumClashes()
+                # taking equally good moves now and then gets off plateaus
+                if count < bestCount or (count == bestCount and rng.random() < 0.3):
+                    bestPos, bestCount = (x, y), count
+            graph.moveVertex(vertex, *bestPos)
+            graph.update()
+            best = graph.getNumClashes()
+    return best
+
+
+class Solver(object):
+    """Bounds the minimum clashes of levels, caching solved blocks."""
+    def __init__(self, cache=None, restarts=4, sweeps=20, seed=1):
+        self.cache = dict(cache or {})
+        self.newEntries = {}
+        self.restarts = restarts
+        self.sweeps = sweeps
+        self.seed = seed
+
+    def solveBlock(self, coords, edges):
+        """return (lower, upper) for a biconnected block with vertices
+        numbered from 0"""
+        numVertices = len(coords)
+        if len(edges) < 3:
+            return 0, 0
+        key = getCanonicalForm(numVertices, edges)
+        if key is not None and key in self.cache:
+            return tuple(self.cache[key])
+        planar = checkPlanarity(numVertices, edges)[0]
+        lower = getLowerBound(numVertices, len(edges), planar)
+        if planar:
+            upper = 0
+        else:
+            upper = self.__searchBlock(coords, edges, lower)
+            assert upper >= lower, 'a layout with %u clashes beats the lower bound %u' % (
+                    upper, lower)
+        if key is not None:
+            self.cache[key] = self.newEntries[key] = (lower, upper)
+        return lower, upper
+
+    def __searchBlock(self, coords, edges, lower):
+        """the fewest clashes found from several starts: planar subgraphs
+        grown from the edges in order and then shuffled, or the given
+        layout if networkx is missing"""
+        rng = random.Random(self.seed)
+        order = sorted(edges)
+        upper = None
+        for restart in range(self.restarts):
+            start = getPlanarStart(len(coords), order)
+            if start is None and restart:
+                break
+            count = searchLayout(start or coords, edges, rng, self.sweeps, lower)
+            upper = count if upper is None else min(upper, count)
+            if upper <= lower:
+                break
+            rng.shuffle(order)
+        return upper
+
+    def solveLevel(self, level):
+        """return (lower, upper) bounds on the minimum clashes of a level"""
+        simpleEdges = set()
+        for v1, v2 in level['edges']:
+            if v1 != v2:
+                simpleEdges.add((min(v1, v2), max(v1, v2)))
+        lower = upper = 0
+        for block in getBlocks(len(level['vertices']), sorted(simpleEdges)):
+            vertices, edges = _relabel(block)
+            blockLower, blockUpper = self.solveBlock(
+                    [level['vertices'][vertex] for vertex in vertices], edges)
+            lower += blockLower
+            upper += blockUpper
+        return lower, upper
+
+
+def getGoal(lower, upper):
+    """the (type, number) goal for bounds on the minimum clashes"""
+    if lower == upper:
+        return '=', upper
+    return '*', upper
+
+
+# each worker process keeps its own solver
+_workerSolver = None
+
+
+def _initWorker(packPath, cache, restarts):
+    global _workerSolver
+    initWorker(packPath)
+    _workerSolver = Solver(cache, restarts)
+
+
+def _solveLevel(levelIdx):
+    lower, upper = _workerSolver.solveLevel(getWorkerPack().getLevel(levelIdx))
+    newEntries, _workerSolver.newEntries = _workerSolver.newEntries, {}
+    return levelIdx, lower, upper, newEntries
+
+
+def loadCache(path):
+    """return the block cache stored at path, or an empty one"""
+    try:
+        with open(path) as fp:
+            return dict((str(key), tuple(value)) for key, value in json.load(fp).items())
+    except (IOError, OSError, ValueError, AttributeError):
+        return {}
+
+
+def saveCache(path, cache):
+    with open(path, 'w') as fp:
+        json.dump(cache, fp, sort_keys=True)
+
+
+def solvePack(packPath, levels, jobs=None, restarts=4, cache=None):
+    """Yield (levelIdx, lower, upper) for levels of a pack as worker
+    processes finish them. Blocks solved on the way are added to cache."""
+    if cache is None:
+        cache = {}
+    jobs = jobs or multiprocessing.cpu_count()
+    if jobs == 1:
+        _initWorker(packPath, cache, restarts)
+        results = (_solveLevel(levelIdx) for levelIdx in levels)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(jobs, _initWorker, (packPath, cache, restarts))
+        # levels differ a lot in size, so hand them out one by one
+        results = pool.imap_unordered(_solveLevel, levels)
+    try:
+        for levelIdx, lower, upper, newEntries in results:
+            cache.update(newEntries)
+            yield levelIdx, lower, upper
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026
+#    The planarity contributors
+#
+# planarity (aka untangle) is free software: you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# planarity is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with planarity.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Command line tools for level packs, run as planarity-tools.
+
+    planarity-tools analyze [PACK]
+
+checks every level of a pack in a pool of worker processes: the initial
+number of clashes, degree statistics, whether the graph is planar and
+whether the scoring goal can be reached at all.
+
+    planarity-tools generate OUT.pack
+
+writes a pack of random line arrangement levels, see planarity.generator.
+
+    planarity-tools solve PACK
+
+bounds the minimum number of clashes of every level and writes the goals
+back into the pack, see planarity.solver. analyze and solve use networkx
+to test planarity if it is installed; it is an optional dependency that
+setup.py doesn't pull in.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from . import generator
+from . import solver
+from .core import Game
+from .levelpack import BASE_SIZE, LevelPack, centerLevel, getWorkerPack, initWorker, setScorings
+
+DEFAULT_PACK = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+        'data', 'levels.pack')
+
+
+def loadLevel(pack, levelIdx):
+    """decode and center a level like the game does at scale 1"""
+    return centerLevel(pack.getLevel(levelIdx), BASE_SIZE)
+
+
+def analyzeLevel(levelIdx):
+    """check one level of the worker's pack and return a report dict"""
+    level = loadLevel(getWorkerPack(), levelIdx)
+    numVertices = len(level['vertices'])
+    edges = level['edges']
+    problems = []
+    warnings = []
+
+    degrees = [0] * numVertices
+    # the game's clash count depends on the endpoint order, so Game gets
+    # the edges as stored; simpleEdges are only for the planarity bounds
+    gameEdges = []
+    simpleEdges = []
+    seen = set()
+    simpleSeen = set()
+    for v1, v2 in edges:
+        if not (0 <= v1 < numVertices and 0 <= v2 < numVertices):
+            problems.append('edge (%u, %u) has no such vertex' % (v1, v2))
+            continue
+        if v1 == v2:
+            problems.append('loop at vertex %u' % v1)
+            continue
+        if (v1, v2) not in seen:
+            seen.add((v1, v2))
+            gameEdges.append((v1, v2))
+        key = min(v1, v2), max(v1, v2)
+        if key in simpleSeen:
+            warnings.append('duplicate edge (%u, %u)' % key)
+            continue
+        simpleSeen.add(key)
+        simpleEdges.append(key)
+        degrees[v1] += 1
+        degrees[v2] += 1
+    isolated = degrees.count(0)
+    if isolated:
+        warnings.append('%u isolated vertices' % isolated)
+
+    report = {
+        'index': levelIdx,
+        'name': level['name'],
+        'vertices': numVertices,
+        'edges': len(edges),
+        'minDegree': min(degrees) if degrees else 0,
+        'maxDegree': max(degrees) if degrees else 0,
+        'meanDegree': 2.0 * len(simpleEdges) / numVertices if numVertices else 0,
+        'problems': problems,
+        'warnings': warnings,
+    }
+    if problems:
+        return report
+
+    game = Game(dict(level, edges=gameEdges))
+    game.prepare()
+    initialClashes = game.getNumClashes()
+    planar, method = solver.checkPlanarity(numVertices, simpleEdges)
+    if planar is None and initialClashes == 0:
+        planar, method = True, 'layout'
+    lowerBound = solver.getLowerBound(numVertices, len(simpleEdges), planar)
+    type_, number = game.getGoal()
+    report.update({
+        'initialClashes': initialClashes,
+        'planar': planar,
+        'planarityMethod': method,
+        'crossingLowerBound': lowerBound,
+        'goal': [type_, number],
+    })
+    # Game.isWon accepts any count up to the goal number for both types
+    if number < lowerBound:
+        problems.append('goal %s %u is below the crossing lower bound %u'
+                % (type_, number, lowerBound))
+    if initialClashes <= number:
+        warnings.append('solved from the start (%u clashes)' % initialClashes)
+    return report
+
+
+def analyzePack(packPath, levels=None, jobs=None):
+    """analyze levels (default: all) of a pack and return the reports"""
+    if levels is None:
+        levels = range(len(LevelPack(packPath)))
+    levels = list(levels)
+    jobs = jobs or multiprocessing.cpu_count()
+    if jobs == 1:
+        initWorker(packPath)
+        return [analyzeLevel(levelIdx) for levelIdx in levels]
+    pool = multiprocessing.Pool(jobs, initWorker, (packPath,))
+    try:
+        chunkSize = max(1, len(levels) // (jobs * 8))
+        return list(pool.imap(analyzeLevel, levels, chunkSize))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def parseLevelRange(text):
+    """'3', '0-99' or '5-' to a slice of level numbers"""
+    start, sep, end = text.partition('-')
+    start = int(start) if start else 0
+    if not sep:
+        return slice(start, start + 1)
+    return slice(start, int(end) + 1 if end else None)
+
+
+def printAnalysis(reports, fp):
+    numProblems = numWarnings = 0
+    for report in reports:
+        fp.write('%5u %-40s V=%-5u E=%-5u clashes=%-6s planar=%-5s goal=%s\n' % (
+                report['index'], report['name'][:40], report['vertices'],
+                report['edges'], report.get('initialClashes', '-'),
+                {True: 'yes', False: 'no', None: '?'}[report.get('planar')],
+                ' '.join(str(part) for part in report.get('goal', ['-']))))
+        for problem in report['problems']:
+            fp.write('      error: %s\n' % problem)
+        for warning in report['warnings']:
+            fp.write('      warning: %s\n' % warning)
+        numProblems += bool(report['problems'])
+        numWarnings += bool(report['warnings'])
+    fp.write('%u levels, %u with errors, %u with warnings\n'
+            % (len(reports), numProblems, numWarnings))
+    return numProblems
+
+
+def analyzeCommand(options):
+    levels = range(len(LevelPack(options.pack)))
+    if options.levels:
+        levels = levels[parseLevelRange(options.levels)]
+    reports = analyzePack(options.pack, levels, options.jobs)
+    numProblems = printAnalysis(reports, sys.stdout)
+    if options.json:
+        with open(options.json, 'w') as fp:
+            json.dump(reports, fp, indent=1, sort_keys=True)
+    return 1 if numProblems else 0
+
+
+def generateCommand(options):
+    minLines, sep, maxLines = options.lines.partition('-')
+    minLines = int(minLines)
+    maxLines = int(maxLines) if maxLines else minLines
+    if minLines < 3 or maxLines < minLines:
+        sys.stderr.write('planarity-tools: need at least 3 lines per level\n')
+        return 2
+    specs = generator.getLevelSpecs(options.count, minLines, maxLines,
+            options.seed, options.layout, options.prefix)
+    numLevels = generator.generatePack(options.pack, specs, options.jobs)
+    sys.stdout.write('%u levels written to %s (seed %u)\n'
+            % (numLevels, options.pack, options.seed))
+    return 0
+
+
+def solveCommand(options):
+    pack = LevelPack(options.pack)
+    levels = range(len(pack))
+    if options.levels:
+        levels = levels[parseLevelRange(options.levels)]
+    cache = solver.loadCache(options.cache) if options.cache else {}
+    scorings = {}
+    numExact = 0
+    for levelIdx, lower, upper in solver.solvePack(options.pack, levels,
+            options.jobs, options.effort, cache):
+        scoring = pack.getInfo(levelIdx)['scoring']
+        goal = solver.getGoal(lower, upper)
+        numExact += goal[0] == '='
+        if goal[0] != '=' and lower <= scoring[3] < upper:
+            # the search didn't get as far as the current goal, which
+            # isn't ruled out either
+            goal = tuple(scoring[2:4])
+        sys.stdout.write('%5u %-40s clashes %u-%u goal %s %u (was %s %s)\n' % (
+                levelIdx, pack.getName(levelIdx)[:40], lower, upper,
+                goal[0], goal[1], scoring[2], scoring[3]))
+        if tuple(scoring[2:4]) != goal:
+            scorings[levelIdx] = tuple(scoring[:2]) + goal
+    pack.close()
+    sys.stdout.write('%u levels, %u exact, %u goals changed\n'
+            % (len(levels), numExact, len(scorings)))
+    if options.cache:
+        solver.saveCache(options.cache, cache)
+    if scorings and not options.dry_run:
+        setScorings(options.pack, scorings)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='planarity-tools',
+            description='Tools for Planarity level packs.')
+    subparsers = parser.add_subparsers(dest='command')
+
+    analyzeParser = subparsers.add_parser('analyze',
+            help='check the levels of a pack and report problems')
+    analyzeParser.add_argument('pack', nargs='?', default=DEFAULT_PACK)
+    analyzeParser.add_argument('--levels', metavar='RANGE',
+            help='level numbers to check, e.g. 7, 0-99 or 100-')
+    analyzeParser.add_argument('-j', '--jobs', type=int,
+            help='worker processes (default: one per CPU)')
+    analyzeParser.add_argument('--json', metavar='FILE',
+            help='also write the reports to FILE')
+    analyzeParser.set_defaults(func=analyzeCommand)
+
+    generateParser = subparsers.add_parser('generate',
+            help='write a pack of random line arrangement levels')
+    generateParser.add_argument('pack', metavar='OUT')
+    generateParser.add_argument('-n', '--count', type=int, default=100,
+            help='number of levels (default: %(default)s)')
+    generateParser.add_argument('--lines', default='4-15', metavar='MIN-MAX',
+            help='lines per level, growing over the pack (default: %(default)s)')
+    generateParser.add_argument('--layout', choices=generator.LAYOUTS, default='circle',
+            help='how the vertices are scrambled (default: %(default)s)')
+    generateParser.add_argument('--seed', type=int, default=int(time.strftime('%Y%m%d')),
+            help='random seed (default: today as YYYYMMDD)')
+    generateParser.add_argument('--prefix', default='Daily',
+            help='level name prefix (default: %(default)s)')
+    generateParser.add_argument('-j', '--jobs', type=int,
+            help='worker processes (default: one per CPU)')
+    generateParser.set_defaults(func=generateCommand)
+
+    solveParser = subparsers.add_parser('solve',
+            help='bound the minimum clashes of levels and set their goals',
+            description='Bound the minimum clashes of levels and set their goals. '
+                'Needs networkx (optional, not installed with planarity) to '
+                'tell planar blocks and for good upper bounds; without it, '
+                'most goals stay approximate.')
+    solveParser.add_argument('pack', nargs='?', default=DEFAULT_PACK)
+    solveParser.add_argument('--levels', metavar='RANGE',
+            help='level numbers to solve, e.g. 7, 0-99 or 100-')
+    solveParser.add_argument('-j', '--jobs', type=int,
+            help='worker processes (default: one per CPU)')
+    solveParser.add_argument('--effort', type=int, default=4, metavar='RESTARTS',
+            help='local searches per non-planar block (default: %(default)s)')
+    solveParser.add_argument('--cache', metavar='FILE',
+            help='keep solved blocks in FILE across runs')
+    solveParser.add_argument('-n', '--dry-run', action='store_true',
+            help="only print the goals, don't write them")
+    solveParser.set_defaults(func=solveCommand)
+
+    options = parser.parse_args(argv)
+    if not getattr(options, 'func', None):
+        parser.error('no command given')
+    return options.func(options)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
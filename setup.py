@@ -11,8 +11,8 @@ setup(
     url='https://www.libavg.de/',
     license='GPL3',
     packages=['planarity'],
-    scripts=['scripts/planarity'],
+    scripts=['scripts/planarity', 'scripts/planarity-tools'],
     package_data={
-            'planarity': ['media/*.png', 'data/levels.pickle.gz'],
+            'planarity': ['media/*.png', 'data/levels.pack'],
     }
 )
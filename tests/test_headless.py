@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026
+#    The planarity contributors
+#
+# planarity (aka untangle) is free software: you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# planarity is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with planarity.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Regression tests for the headless game logic, run with
+
+    python -m unittest discover tests
+
+libavg is not needed.
+"""
+
+import itertools
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from planarity import solver
+from planarity.core import Graph
+from planarity.geometry import segmentIntersection
+from planarity.levelpack import ChainHashes, LevelPack
+
+PACK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+        'planarity', 'data', 'levels.pack')
+
+
+def findClashesBruteForce(coords, edges):
+    """the clashes as the original game found them: every pair of edges
+    intersected with segmentIntersection()"""
+    clashes = {}
+    for edge1, edge2 in itertools.combinations(range(len(edges)), 2):
+        (v1, v2), (v3, v4) = edges[edge1], edges[edge2]
+        pos = segmentIntersection(coords[v1][0], coords[v1][1], coords[v2][0], coords[v2][1],
+                coords[v3][0], coords[v3][1], coords[v4][0], coords[v4][1])
+        if pos:
+            clashes[edge1, edge2] = pos
+    return clashes
+
+
+class GraphUpdateTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = random.Random(7)
+        self.numVertices = 40
+        self.coords = [(self.rng.uniform(0, 1280), self.rng.uniform(0, 720))
+                for vertex in range(self.numVertices)]
+        self.edges = sorted(set(tuple(sorted(self.rng.sample(range(self.numVertices), 2)))
+                for i in range(90)))
+
+    def assertClashesMatch(self, graph):
+        coords = [graph.getPos(vertex) for vertex in range(self.numVertices)]
+        expected = findClashesBruteForce(coords, self.edges)
+        self.assertEqual(sorted(graph.clashes), sorted(expected))
+        for pair, (x, y) in expected.items():
+            self.assertAlmostEqual(graph.clashes[pair][0], x, places=6)
+            self.assertAlmostEqual(graph.clashes[pair][1], y, places=6)
+
+    def testFindClashes(self):
+        graph = Graph(self.coords, self.edges)
+        graph.findClashes()
+        self.assertClashesMatch(graph)
+
+    def testUpdateAfterDrags(self):
+        graph = Graph(self.coords, self.edges)
+        graph.findClashes()
+        for step in range(30):
+            vertices = list(range(self.numVertices))
+            self.rng.shuffle(vertices)
+            # two disjoint groups dragged rigidly, plus single vertices
+            for group in (vertices[:8], vertices[8:14]):
+                for move in range(self.rng.randint(1, 3)):
+                    graph.translateVertices(group, self.rng.uniform(-60, 60),
+                            self.rng.uniform(-60, 60))
+            for vertex in vertices[14:14 + self.rng.randint(0, 3)]:
+                graph.moveVertex(vertex, self.rng.uniform(0, 1280), self.rng.uniform(0, 720))
+            graph.update()
+            self.assertClashesMatch(graph)
+
+
+class ChainHashesTest(unittest.TestCase):
+    # computed with the original game from levels.pickle.gz
+    SEED = '/home/player/.avg'
+    KNOWN_HASHES = {
+        0: '79f2173de850cb354aecabc40d54c5b2',
+        40: 'c1267ae5365560cd1dba0ff1c4ee1b07',
+        87: '186c570a1b4fd29fb527e450bc3ffa66',
+    }
+
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.cachePath = os.path.join(self.tempDir, 'levelhashes.json')
+        self.pack = LevelPack(PACK_PATH)
+
+    def tearDown(self):
+        self.pack.close()
+        shutil.rmtree(self.tempDir)
+
+    def testKnownHashes(self):
+        hashes = ChainHashes(self.pack, self.SEED, self.cachePath)
+        self.assertEqual(len(hashes), 88)
+        for levelIdx, levelHash in sorted(self.KNOWN_HASHES.items()):
+            self.assertEqual(hashes[levelIdx], levelHash)
+
+    def testFindFromCache(self):
+        hashes = ChainHashes(self.pack, self.SEED, self.cachePath)
+        self.assertEqual(hashes[40], self.KNOWN_HASHES[40])
+        # the cached prefix is extended past level 40 from scratch
+        cached = ChainHashes(self.pack, self.SEED, self.cachePath)
+        self.assertEqual(cached.find(self.KNOWN_HASHES[40]), 40)
+        self.assertEqual(cached.find(self.KNOWN_HASHES[87]), 87)
+        self.assertEqual(cached.find('not a level hash'), None)
+
+
+class SolverTest(unittest.TestCase):
+    def getCircle(self, numVertices):
+        return [(100 * math.cos(2 * math.pi * vertex / numVertices),
+                100 * math.sin(2 * math.pi * vertex / numVertices))
+                for vertex in range(numVertices)]
+
+    def testK4(self):
+        edges = list(itertools.combinations(range(4), 2))
+        self.assertEqual(solver.Solver().solveBlock(self.getCircle(4), edges), (0, 0))
+
+    def testK5(self):
+        edges = list(itertools.combinations(range(5), 2))
+        lower, upper = solver.Solver().solveBlock(self.getCircle(5), edges)
+        self.assertTrue(lower >= 1)
+        self.assertTrue(upper >= lower)
+
+
+if __name__ == '__main__':
+    unittest.main()